@@ -0,0 +1,60 @@
+"""Benchmark the per-request cost of getting a Copy Creator agent.
+
+Before the agent factory, every request built a model client, the main graph
+and all four subagent graphs. With it, requests after the first only look up
+the already compiled agent. No model calls are made, but constructing the
+Gemini client needs an API key, so a placeholder is set if none is configured.
+
+    python -m benchmarks.bench_copy_creator_build
+"""
+
+import os
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "placeholder")
+
+from deepagents import create_deep_agent, get_default_model  # noqa: E402
+from deepagents.middleware import _get_agents  # noqa: E402
+from examples.copy_creator.agent import COPY_CREATOR_INSTRUCTIONS  # noqa: E402
+from examples.copy_creator.factory import (  # noqa: E402
+    COPY_CREATOR_SUBAGENTS,
+    COPY_CREATOR_TOOLS,
+    get_copy_creator,
+)
+
+REQUESTS = 20
+
+
+def _build_per_request() -> None:
+    model = get_default_model()
+    create_deep_agent(
+        tools=COPY_CREATOR_TOOLS,
+        instructions=COPY_CREATOR_INSTRUCTIONS,
+        model=model,
+        subagents=COPY_CREATOR_SUBAGENTS,
+    )
+    # Subagent graphs used to be compiled together with the main graph
+    agents = _get_agents(COPY_CREATOR_TOOLS, COPY_CREATOR_SUBAGENTS, model)
+    for name in agents:
+        agents[name]
+
+
+def _time(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    rebuilt = _time(_build_per_request, REQUESTS)
+    first = _time(lambda: get_copy_creator(COPY_CREATOR_INSTRUCTIONS), 1)
+    cached = _time(lambda: get_copy_creator(COPY_CREATOR_INSTRUCTIONS), REQUESTS * 1000)
+    print(f"{'strategy':>24} {'per request (ms)':>18}")
+    print(f"{'rebuild every request':>24} {rebuilt * 1e3:>18.2f}")
+    print(f"{'factory, first request':>24} {first * 1e3:>18.2f}")
+    print(f"{'factory, cached':>24} {cached * 1e3:>18.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Benchmark paged `read_file` calls against file size.
+
+With the line index, the cost of reading a fixed window of lines should not
+depend on how large the file is once the index for that file version exists.
+
+    python -m benchmarks.bench_read_file
+"""
+
+import time
+
+from deepagents.tools import read_file
+
+LIMIT = 100
+READS = 200
+FILE_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def _read_cost(num_lines: int) -> tuple[float, float]:
+    content = "".join(f"line {i}: lorem ipsum dolor sit amet\n" for i in range(num_lines))
+    state = {"messages": [], "files": {"research.md": content}}
+    read = read_file.func
+
+    start = time.perf_counter()
+    read(file_path="research.md", state=state, offset=0, limit=LIMIT)
+    first_read = time.perf_counter() - start
+
+    step = max(1, (num_lines - LIMIT) // READS)
+    start = time.perf_counter()
+    for i in range(READS):
+        read(file_path="research.md", state=state, offset=(i * step) % num_lines, limit=LIMIT)
+    paged_read = (time.perf_counter() - start) / READS
+    return first_read, paged_read
+
+
+def main() -> None:
+    print(f"{'lines':>10} {'first read (ms)':>16} {'paged read (us)':>16}")
+    for num_lines in FILE_SIZES:
+        first_read, paged_read = _read_cost(num_lines)
+        print(f"{num_lines:>10} {first_read * 1e3:>16.2f} {paged_read * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
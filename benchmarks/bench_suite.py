@@ -0,0 +1,191 @@
+"""Measure deepagents' own overhead, offline, with a scripted model.
+
+Every scenario drives real agents with `ScriptedChatModel`, so nothing calls a
+provider and the numbers only reflect the framework: graph construction,
+middleware, tool dispatch, subagent delegation and memory. Results are printed
+and, with `--output`, written as JSON to compare runs against each other.
+
+    python -m benchmarks.bench_suite --output results.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from langchain.agents import create_agent
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from benchmarks.scripted_model import ScriptedChatModel, tool_call
+from deepagents import create_deep_agent
+from deepagents.tools import create_filesystem_tools
+
+STEPS = 20
+FILES = 20
+SEARCH_FILES = 500
+
+
+@tool
+def noop(value: int) -> str:
+    """Return immediately."""
+    return "ok"
+
+
+def _median_seconds(fn: Callable[[], object], repeat: int) -> float:
+    fn()  # warm up caches and lazy imports
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _peak_bytes(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _invoke(agent) -> Callable[[], object]:
+    # Each step is several graph nodes (middleware hooks, model, tools)
+    return lambda: agent.invoke({"messages": [{"role": "user", "content": "go"}]}, {"recursion_limit": 1000})
+
+
+def _noop_steps_model() -> ScriptedChatModel:
+    return ScriptedChatModel(script=[
+        *(AIMessage(content="", tool_calls=[tool_call("noop", f"call-{i}", value=i)]) for i in range(STEPS)),
+        AIMessage(content="done"),
+    ])
+
+
+def bench_build(repeat: int) -> dict:
+    model = ScriptedChatModel(script=[AIMessage(content="done")])
+    subagents = [
+        {"name": f"worker-{i}", "description": "Does work.", "prompt": "Work.", "tools": ["noop"]}
+        for i in range(4)
+    ]
+    seconds = _median_seconds(
+        lambda: create_deep_agent([noop], "Benchmark.", model=model, subagents=subagents), repeat
+    )
+    return {"create_deep_agent_ms": seconds * 1e3}
+
+
+def bench_step_overhead(repeat: int) -> dict:
+    """Time per model + tool step of a deep agent, against a bare agent with the same tools."""
+    model = _noop_steps_model()
+    # An empty middleware keeps the baseline on the same (middleware) agent loop as deep agents
+    bare = _median_seconds(_invoke(create_agent(model, tools=[noop], middleware=[AgentMiddleware()])), repeat)
+    deep = _median_seconds(_invoke(create_deep_agent([noop], "Benchmark.", model=model)), repeat)
+    steps = STEPS + 1
+    return {
+        "bare_step_ms": bare / steps * 1e3,
+        "deep_agent_step_ms": deep / steps * 1e3,
+        "middleware_overhead_per_step_ms": (deep - bare) / steps * 1e3,
+    }
+
+
+def bench_filesystem(repeat: int) -> dict:
+    """Throughput of the virtual filesystem tools, called through the agent's tool node."""
+    script = []
+    for i in range(FILES):
+        path = f"/notes/{i}.md"
+        # One turn per file: write, then read and edit (run after the write, see ToolCallSchedulingMiddleware)
+        script.append(AIMessage(content="", tool_calls=[
+            tool_call("write_file", f"write-{i}", file_path=path, content="draft line\n" * 200),
+            tool_call("read_file", f"read-{i}", file_path=path, offset=50, limit=20),
+            tool_call("edit_file", f"edit-{i}", file_path=path, old_string="draft line\n", new_string="final line\n", replace_all=True),
+        ]))
+    script.append(AIMessage(content="done"))
+    agent = create_deep_agent([], "Benchmark.", model=ScriptedChatModel(script=script))
+    seconds = _median_seconds(_invoke(agent), repeat)
+    return {
+        "tool_calls_per_second": 3 * FILES / seconds,
+        "run_ms": seconds * 1e3,
+        "peak_memory_kb": _peak_bytes(_invoke(agent)) / 1024,
+    }
+
+
+def bench_task_delegation(repeat: int) -> dict:
+    """Cost of a `task` call to a subagent that answers at once, against a plain tool call."""
+    worker = ScriptedChatModel(script=[AIMessage(content="report")])
+    subagents = [{"name": "worker", "description": "Does work.", "prompt": "Work.", "model": worker}]
+    delegating = ScriptedChatModel(script=[
+        AIMessage(content="", tool_calls=[tool_call("task", "task-1", description="Do the work.", subagent_type="worker")]),
+        AIMessage(content="done"),
+    ])
+    direct = ScriptedChatModel(script=[
+        AIMessage(content="", tool_calls=[tool_call("noop", "noop-1", value=1)]),
+        AIMessage(content="done"),
+    ])
+    delegating_agent = create_deep_agent([noop], "Benchmark.", model=delegating, subagents=subagents)
+    task = _median_seconds(_invoke(delegating_agent), repeat)
+    plain = _median_seconds(_invoke(create_deep_agent([noop], "Benchmark.", model=direct, subagents=subagents)), repeat)
+    return {
+        "task_run_ms": task * 1e3,
+        "task_overhead_ms": (task - plain) * 1e3,
+        "peak_memory_kb": _peak_bytes(_invoke(delegating_agent)) / 1024,
+    }
+
+
+def bench_search(repeat: int) -> dict:
+    """Latency of `glob` and `grep` over many generated files, once their index is built."""
+    files = {
+        f"/outputs/{i % 10}/{i}.md": "\n".join(f"item {i}-{line}: draft text for section {line}" for line in range(100))
+        for i in range(SEARCH_FILES)
+    }
+    files["/outputs/7/7.md"] += "\nneedle: the one line to find\n"
+    state = {"messages": [], "files": files}
+    tools = {t.name: t for t in create_filesystem_tools()}
+    start = time.perf_counter()
+    tools["grep"].invoke({"pattern": "needle", "state": state})
+    index_seconds = time.perf_counter() - start
+    grep = _median_seconds(lambda: tools["grep"].invoke({"pattern": "needle: the one", "state": state}), repeat)
+    glob = _median_seconds(lambda: tools["glob"].invoke({"pattern": "/outputs/7/*.md", "state": state}), repeat)
+    return {"index_build_ms": index_seconds * 1e3, "grep_ms": grep * 1e3, "glob_ms": glob * 1e3}
+
+
+BENCHMARKS = {
+    "build": bench_build,
+    "step_overhead": bench_step_overhead,
+    "filesystem": bench_filesystem,
+    "task_delegation": bench_task_delegation,
+    "search": bench_search,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement (the median is reported)")
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), action="append", help="Run only these benchmarks")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        results[name] = BENCHMARKS[name](args.repeat)
+        for metric, value in results[name].items():
+            print(f"{name:>16} {metric:>32} {value:>12.3f}")
+
+    if args.output:
+        report = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""A deterministic chat model that replays a fixed script of responses.
+
+Each run of an agent starts the script over: the step to replay is read from
+the messages since the last human message, so the same model instance can
+serve any number of runs, one after another or concurrently.
+"""
+
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replays `script`, one response per model call; the last response repeats."""
+
+    script: list[AIMessage]
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return self
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        step = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            # Middleware may add AI messages of its own; only count the ones replayed from the script
+            if isinstance(message, AIMessage) and "script_step" in message.response_metadata:
+                step = message.response_metadata["script_step"] + 1
+                break
+        response = self.script[min(step, len(self.script) - 1)]
+        message = response.model_copy(update={"response_metadata": {"script_step": step}})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def tool_call(name: str, call_id: str, **args: Any) -> dict:
+    return {"name": name, "args": args, "id": call_id, "type": "tool_call"}
@@ -2,20 +2,13 @@
 
 import asyncio
 import re
-from typing import Optional
-from deepagents import create_deep_agent, get_default_model
-from examples.copy_creator.tools import (
-    internet_search,
-    get_validated_copies,
-    get_copywriting_formulas,
-    get_market_data_templates,
-    get_base_copys
-)
-from examples.copy_creator.agents.market_research_agent import market_research_agent
-from examples.copy_creator.agents.hook_strategy_agent import hook_strategy_agent
-from examples.copy_creator.agents.copy_creation_agent import copy_creation_agent
-from examples.copy_creator.agents.quality_assurance_agent import quality_assurance_agent
-from examples.copy_creator.models.copy_output import CopyOutput, CopyObject
+import uuid
+from typing import Any, AsyncIterator, Optional
+from langgraph.checkpoint.memory import InMemorySaver
+
+from examples.copy_creator.factory import get_copy_creator
+from examples.copy_creator.middleware import get_copies
+from examples.copy_creator.models.copy_output import CopyOutput
 
 
 # PROMPT CONTENT PLACEHOLDER
@@ -58,7 +51,7 @@ Before executing any tools, check if user provided ALL 6 mandatory pieces of inf
 If ALL 6 pieces are present, THEN execute in sequence:
 1. write_todos (FIRST ACTION)
 2. write_file (SECOND ACTION)
-3. get_validated_copies (THIRD ACTION)
+3. search_knowledge_base (THIRD ACTION)
 4. task → market-research-agent (FOURTH ACTION)
 
 **STEP 3: IF DATA IS MISSING**
@@ -269,7 +262,7 @@ If the user mentions:
 **IF ALL DATA IS COMPLETE, THEN EXECUTE:**
 1. **CALL write_todos NOW** - Create a list with the 4 mandatory steps
 2. **CALL write_file NOW** - Save the original question in 'original_question.txt'
-3. **CALL get_validated_copies NOW** - Access the 17 validated copies
+3. **CALL search_knowledge_base NOW** - Find the validated copies for the requested service
 4. **CALL task NOW** - Run market-research-agent
 
 **IF DATA IS INCOMPLETE:**
@@ -281,7 +274,7 @@ Respond in Portuguese asking for missing information. DO NOT execute tools.
 Available tools you MUST use:
 - 'write_todos': MANDATORY as first action
 - 'write_file': MANDATORY to save question
-- 'get_validated_copies': MANDATORY to access database
+- 'search_knowledge_base': MANDATORY to access database
 - 'task': MANDATORY to call sub-agents
 
 ### FILES TO BE CREATED DURING THE PROCESS:
@@ -310,6 +303,10 @@ A system that replicates the process of a specialized copywriting agency, ensuri
 """
 
 
+# Checkpoints of runs in progress, so a failed run resumes where it stopped; deleted once a run ends
+RUN_CHECKPOINTER = InMemorySaver()
+
+
 def validate_input(input_data: dict) -> tuple[bool, Optional[str], Optional[int]]:
     """
     Validate input data for copy creation.
@@ -344,25 +341,40 @@ def validate_input(input_data: dict) -> tuple[bool, Optional[str], Optional[int]
     return True, None, n
 
 
-def extract_score_from_audit(audit_content: str, copy_number: int) -> Optional[float]:
+def build_copy_output(input_data: dict, n: int, result: dict) -> CopyOutput:
     """
-    Extract score for a specific copy from quality audit.
+    Build the structured output of a finished run.
 
     Args:
-        audit_content: Content of quality_audit.md
-        copy_number: Copy number (1-indexed)
+        input_data: Input data dictionary
+        n: Number of copies requested
+        result: Final agent state
 
     Returns:
-        Score (1-10) or None if not found
+        Structured CopyOutput
     """
-    # Look for patterns like "Copy 1: 8.5/10" or "Score: 8.5"
-    pattern = rf"Copy\s*{copy_number}.*?(\d+\.?\d*)\s*/\s*10"
-    match = re.search(pattern, audit_content, re.IGNORECASE)
+    # Copies and scores submitted by the subagents, already structured
+    copies = get_copies(result)
+
+    # Build metadata
+    metadata = {
+        "client_name": input_data.get("cliente", ""),
+        "region": input_data.get("regiao", ""),
+        "service": input_data.get("servico", ""),
+        "total_copies": len(copies),
+        "requested_copies": n
+    }
 
-    if match:
-        return float(match.group(1))
+    # Get final message
+    messages = result.get("messages", [])
+    final_message = messages[-1].content if messages else "Copies geradas com sucesso!"
 
-    return None
+    return {
+        "message": final_message,
+        "type": "copies",
+        "copies": copies,
+        "metadata": metadata
+    }
 
 
 async def invoke_with_structured_output(
@@ -373,10 +385,15 @@ async def invoke_with_structured_output(
     """
     Invoke Copy Creator agent with structured output.
 
+    Each run is checkpointed under its own thread. When a step fails (e.g. a
+    model call in the last subagent), the run is resumed from the last
+    checkpoint, so only the failed step runs again and the steps that
+    already succeeded are not paid for twice.
+
     Args:
         input_data: Input data dictionary
         max_retries: Maximum retry attempts
-        retry_delay: Delay between retries (seconds)
+        retry_delay: Delay before the first retry (seconds), doubled after each failed retry
 
     Returns:
         Structured CopyOutput
@@ -392,85 +409,36 @@ async def invoke_with_structured_output(
             "metadata": None
         }
 
-    # Create Copy Creator agent
-    copy_creator = create_deep_agent(
-        tools=[
-            internet_search,
-            get_validated_copies,
-            get_copywriting_formulas,
-            get_market_data_templates,
-            get_base_copys
-        ],
-        instructions=COPY_CREATOR_INSTRUCTIONS,
-        model=get_default_model(),
-        subagents=[
-            market_research_agent,
-            hook_strategy_agent,
-            copy_creation_agent,
-            quality_assurance_agent
-        ]
-    )
+    # Shared across requests; only built on the first one
+    copy_creator = get_copy_creator(COPY_CREATOR_INSTRUCTIONS, checkpointer=RUN_CHECKPOINTER)
+    thread_id = str(uuid.uuid4())
+    config = {"configurable": {"thread_id": thread_id}}
+    agent_input = {"messages": [{"role": "user", "content": str(input_data)}]}
 
     # Retry logic
-    for attempt in range(max_retries):
-        try:
-            # Invoke agent
-            result = await copy_creator.ainvoke({
-                "messages": [{"role": "user", "content": str(input_data)}]
-            })
-
-            # Extract copies from files
-            files = result.get("files", {})
-            copies = []
-
-            # Read quality audit if available
-            audit_content = files.get("quality_audit.md", "")
-
-            # Extract all copies (copy1.md, copy2.md, ..., copyN.md)
-            i = 1
-            while f"copy{i}.md" in files:
-                score = extract_score_from_audit(audit_content, i)
-
-                copies.append({
-                    "id": f"copy-{i}",
-                    "content": files[f"copy{i}.md"],
-                    "score": score
-                })
-                i += 1
-
-            # Build metadata
-            metadata = {
-                "client_name": input_data.get("cliente", ""),
-                "region": input_data.get("regiao", ""),
-                "service": input_data.get("servico", ""),
-                "total_copies": len(copies),
-                "requested_copies": n
-            }
-
-            # Get final message
-            messages = result.get("messages", [])
-            final_message = messages[-1].content if messages else "Copies geradas com sucesso!"
-
-            return {
-                "message": final_message,
-                "type": "copies",
-                "copies": copies,
-                "metadata": metadata
-            }
-
-        except Exception as e:
-            if attempt < max_retries - 1:
-                # Wait before retry
-                await asyncio.sleep(retry_delay)
-                continue
-            else:
-                # Final attempt failed
-                return {
-                    "message": f"Erro após {max_retries} tentativas: {str(e)}",
-                    "type": "validation_error",
-                    "copies": None,
-                    "metadata": None
-                }
+    try:
+        for attempt in range(max_retries):
+            try:
+                # The first attempt starts the run; retries resume it from its last checkpoint
+                result = await copy_creator.ainvoke(agent_input if attempt == 0 else None, config)
+
+                return build_copy_output(input_data, n, result)
+
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    # Wait before retry, longer after each failure
+                    await asyncio.sleep(retry_delay * 2 ** attempt)
+                    continue
+                else:
+                    # Final attempt failed
+                    return {
+                        "message": f"Erro após {max_retries} tentativas: {str(e)}",
+                        "type": "validation_error",
+                        "copies": None,
+                        "metadata": None
+                    }
+    finally:
+        await RUN_CHECKPOINTER.adelete_thread(thread_id)
 
     # Should not reach here, but just in case
     return {
@@ -481,6 +449,65 @@ async def invoke_with_structured_output(
     }
 
 
+def _copies_updates(update: Any) -> list[dict]:
+    """Return the `copies` updates in one node's stream update."""
+    # Tool nodes report one update per tool call
+    updates = update if isinstance(update, list) else [update]
+    return [u["copies"] for u in updates if isinstance(u, dict) and u.get("copies")]
+
+
+async def stream_copies(input_data: dict) -> AsyncIterator[dict]:
+    """
+    Run the Copy Creator agent and yield events as results are produced.
+
+    Copies and scores are reported as soon as a subagent submits them, long
+    before the whole pipeline finishes. Events are dictionaries with a `type`:
+
+    - `copy`: a copy was submitted or replaced (`copy`: CopyObject without its score)
+    - `score`: a copy received its score (`id`, `score`)
+    - `result`: the run finished (`result`: CopyOutput, as from `invoke_with_structured_output`)
+
+    Args:
+        input_data: Input data dictionary
+
+    Yields:
+        Events, ending with a single `result` event
+    """
+    is_valid, error_msg, n = validate_input(input_data)
+    if not is_valid:
+        yield {
+            "type": "result",
+            "result": {"message": error_msg, "type": "validation_error", "copies": None, "metadata": None},
+        }
+        return
+
+    copy_creator = get_copy_creator(COPY_CREATOR_INSTRUCTIONS)
+    state = {}
+    # Submissions reach the main agent again when each subagent returns; only report changes
+    sent: dict[int, dict] = {}
+    async for namespace, mode, chunk in copy_creator.astream(
+        {"messages": [{"role": "user", "content": str(input_data)}]},
+        # Subagent graphs run inside the `task` tool; their updates are what arrive first
+        stream_mode=["updates", "values"],
+        subgraphs=True,
+    ):
+        if mode == "values":
+            if not namespace:
+                state = chunk
+            continue
+        for node_update in chunk.values():
+            for copies in _copies_updates(node_update):
+                for number, fields in copies.items():
+                    previous = sent.setdefault(number, {})
+                    if "content" in fields and fields["content"] != previous.get("content"):
+                        yield {"type": "copy", "copy": {"id": f"copy-{number}", "content": fields["content"]}}
+                    if "score" in fields and fields["score"] != previous.get("score"):
+                        yield {"type": "score", "id": f"copy-{number}", "score": fields["score"]}
+                    previous.update(fields)
+
+    yield {"type": "result", "result": build_copy_output(input_data, n, state)}
+
+
 async def refine_copy(
     original_input: dict,
     copy_number: int,
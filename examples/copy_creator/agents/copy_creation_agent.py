@@ -80,14 +80,15 @@ For each copy (from 1 to N):
 **CRITICAL INSTRUCTIONS**:
 - Create EXACTLY N copies (where N is specified in user input)
 - Save each copy in a separate file: copy1.md, copy2.md, ..., copy{N}.md
+- After saving each copy, call 'submit_copy' with its number and the complete copy text (only the copy itself, without the analysis)
 - Each copy must use a unique hook from the Hook Strategy Agent (Hook 1, Hook 2, ..., Hook N)
 - All copies must be 30-40 seconds when read aloud
 - ALL COPIES MUST BE IN NATURAL AMERICAN ENGLISH
 
 EXECUTION INSTRUCTIONS:
-1. **FIRST ACTION**: Use 'get_validated_copies' to access the 17 reference copies
-2. **SECOND ACTION**: Use 'get_copywriting_formulas' to access formulas and structures
-3. **THIRD ACTION**: Use 'get_base_copys' for detailed visual examples
+1. **FIRST ACTION**: Use 'search_knowledge_base' to find the validated copies closest to this service and offer (e.g. "copies de pavers com desconto")
+2. **SECOND ACTION**: Use 'search_knowledge_base' again for the formulas, triggers and CTAs that fit each hook
+3. Only if the search results are not enough, use 'get_validated_copies' to load all 17 reference copies
 4. Create each copy by EXACTLY following the patterns of the validated copies
 
 IMPORTANT:
@@ -104,5 +105,5 @@ copy_creation_agent: SubAgent = {
     "name": "copy_creation",
     "description": "Expert copywriter specializing in creating N 30-40 second copies (where N is the number requested) for the construction and home improvement industry. Uses knowledge base of 17 validated copies and applies proven copywriting frameworks (AIDA, PAS, etc.). Saves each copy in individual files (copy1.md, copy2.md, ..., copyN.md).",
     "prompt": COPY_CREATION_PROMPT,
-    "tools": ["read_file", "write_file", "get_validated_copies", "get_base_copys", "get_copywriting_formulas"]
+    "tools": ["read_file", "write_file", "search_knowledge_base", "get_validated_copies"]
 }
@@ -55,6 +55,8 @@ HOOK PRINCIPLES:
 - Authority Hook: Use credentials/reviews/years of experience relevant to the region
 - Benefit Hook: Focus on the transformation most desired by the main persona
 
+Use 'search_knowledge_base' to look up the tested opening hooks and triggers for each strategy (e.g. "hooks de urgência", "prova social").
+
 OUTPUT FORMAT:
 ## Hook Strategy - [Client Name]
 **Total Hooks to Create: N**
@@ -82,5 +84,5 @@ hook_strategy_agent: SubAgent = {
     "name": "hook_strategy",
     "description": "Specialist in creating persuasive hooks based on consumer psychology. Creates N distinct hook strategies (where N is the number of copies requested) using core types like Urgency/Scarcity, Authority/Credibility, Benefit/Transformation, and variations based on specific insights from the local market.",
     "prompt": HOOK_STRATEGY_PROMPT,
-    "tools": ["read_file", "write_file", "get_copywriting_formulas"]
+    "tools": ["read_file", "write_file", "search_knowledge_base"]
 }
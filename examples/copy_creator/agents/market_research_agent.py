@@ -26,7 +26,7 @@ REQUIRED OUTPUT:
 - Positioning recommendations
 
 SPECIFIC INSTRUCTIONS:
-1. **FIRST ACTION**: Use 'get_market_data_templates' to access research templates
+1. **FIRST ACTION**: Use 'search_knowledge_base' to find the research and persona templates you need (e.g. "templates de personas", "análise competitiva")
 2. Use the internet search tool to research specific demographic data for the region mentioned
 3. Identify socioeconomic characteristics of property owners in the area
 4. Analyze purchasing behavior patterns for construction/renovation services in the region
@@ -39,7 +39,7 @@ SPECIFIC INSTRUCTIONS:
 6. Map key competitors in the region
 7. Suggest differentiated positioning in the local market
 
-**IMPORTANT**: Use the \`get_market_data_templates\` templates as a structural basis for your analysis.
+**IMPORTANT**: Use the templates from the knowledge base as a structural basis for your analysis.
 
 OUTPUT FORMAT:
 ## Market Analysis - [Region]
@@ -70,5 +70,5 @@ market_research_agent: SubAgent = {
     "name": "market_research",
     "description": "Specialist in local market analysis and persona creation for the construction and home improvement sector. Use this agent when you need demographic data, competitive analysis, and insights about the target audience of a specific region.",
     "prompt": MARKET_RESEARCH_PROMPT,
-    "tools": ["internet_search", "get_market_data_templates", "write_file", "read_file"]
+    "tools": ["internet_search", "search_knowledge_base", "write_file", "read_file"]
 }
@@ -92,6 +92,7 @@ For each copy (from 1 to N):
 **CRITICAL INSTRUCTIONS**:
 - Audit ALL N copies (read copy1.md, copy2.md, ..., copyN.md)
 - Provide individual scores for each copy
+- After auditing each copy, call 'submit_score' with its number and final score (1-10)
 - Ensure each evaluation is thorough and detailed
 
 ## Final Ranking and Recommendations
@@ -0,0 +1,135 @@
+"""Process-wide cache of compiled Copy Creator agents.
+
+Compiling the agent (main graph, subagent registry and model client) is much
+more expensive than a single request needs it to be, and the result does not
+depend on the request. Agents are built once per configuration and shared by
+every request in the process.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Optional, Sequence
+
+from langchain_core.tools import BaseTool
+from langgraph.types import Checkpointer
+
+from deepagents import (
+    JSONLSpanExporter,
+    ToolResultCompactionMiddleware,
+    Tracer,
+    create_deep_agent,
+    get_chat_model,
+    get_default_model,
+)
+from examples.copy_creator.middleware import CopyOutputMiddleware
+from examples.copy_creator.tools import (
+    internet_search,
+    search_knowledge_base,
+    get_validated_copies,
+    get_copywriting_formulas,
+    get_market_data_templates,
+    get_base_copys
+)
+from examples.copy_creator.agents.market_research_agent import market_research_agent
+from examples.copy_creator.agents.hook_strategy_agent import hook_strategy_agent
+from examples.copy_creator.agents.copy_creation_agent import copy_creation_agent
+from examples.copy_creator.agents.quality_assurance_agent import quality_assurance_agent
+
+
+COPY_CREATOR_TOOLS = [
+    internet_search,
+    search_knowledge_base,
+    get_validated_copies,
+    get_copywriting_formulas,
+    get_market_data_templates,
+    get_base_copys
+]
+
+COPY_CREATOR_SUBAGENTS = [
+    market_research_agent,
+    hook_strategy_agent,
+    copy_creation_agent,
+    quality_assurance_agent
+]
+
+# Set COPY_CREATOR_TRACE_FILE to record where each run spends its time and tokens, one span per line
+COPY_CREATOR_TRACER = (
+    Tracer([JSONLSpanExporter(os.environ["COPY_CREATOR_TRACE_FILE"])])
+    if os.getenv("COPY_CREATOR_TRACE_FILE")
+    else None
+)
+
+_agents: dict[tuple, Any] = {}
+_agents_lock = threading.Lock()
+
+
+def _cache_key(
+    instructions: str,
+    tools: Sequence[BaseTool],
+    model_settings: Optional[dict[str, Any]],
+    checkpointer: Checkpointer,
+) -> tuple:
+    return (
+        instructions,
+        tuple(t.name for t in tools),
+        json.dumps(model_settings, sort_keys=True, default=str),
+        # Checkpointers are compared by identity
+        id(checkpointer),
+    )
+
+
+def get_copy_creator(
+    instructions: str,
+    tools: Sequence[BaseTool] = COPY_CREATOR_TOOLS,
+    model_settings: Optional[dict[str, Any]] = None,
+    checkpointer: Checkpointer = None,
+):
+    """
+    Return the compiled Copy Creator agent for this configuration.
+
+    The agent is built on first use and reused afterwards. Compiled graphs are
+    stateless between invocations, so one instance can serve concurrent requests.
+
+    Args:
+        instructions: System instructions for the main agent
+        tools: Tools for the main agent (subagents refer to them by name)
+        model_settings: Settings for `init_chat_model`; the default Gemini model when omitted
+        checkpointer: Optional checkpointer, to resume runs by `thread_id`
+
+    Returns:
+        Compiled Copy Creator agent
+    """
+    key = _cache_key(instructions, tools, model_settings, checkpointer)
+    agent = _agents.get(key)
+    if agent is None:
+        with _agents_lock:
+            # Requests arriving together at startup should not each build the agent
+            agent = _agents.get(key)
+            if agent is None:
+                model = get_default_model() if model_settings is None else get_chat_model(**model_settings)
+                # Full knowledge base dumps and subagent reports go to files instead of staying in context;
+                # copies and scores are submitted into the shared `copies` channel
+                subagents = [
+                    {
+                        **subagent,
+                        "middleware": [
+                            *subagent.get("middleware", []),
+                            ToolResultCompactionMiddleware(),
+                            CopyOutputMiddleware(),
+                        ],
+                    }
+                    for subagent in COPY_CREATOR_SUBAGENTS
+                ]
+                agent = _agents[key] = create_deep_agent(
+                    tools=list(tools),
+                    instructions=instructions,
+                    model=model,
+                    subagents=subagents,
+                    middleware=[ToolResultCompactionMiddleware(), CopyOutputMiddleware()],
+                    # Knowledge base results are large; summarize them once read
+                    summarization={"incremental": True},
+                    checkpointer=checkpointer,
+                    tracer=COPY_CREATOR_TRACER,
+                )
+    return agent
@@ -3,18 +3,7 @@
 This is the main entry point for the LangGraph Server.
 """
 
-from deepagents import create_deep_agent, get_default_model
-from examples.copy_creator.tools import (
-    internet_search,
-    get_validated_copies,
-    get_copywriting_formulas,
-    get_market_data_templates,
-    get_base_copys
-)
-from examples.copy_creator.agents.market_research_agent import market_research_agent
-from examples.copy_creator.agents.hook_strategy_agent import hook_strategy_agent
-from examples.copy_creator.agents.copy_creation_agent import copy_creation_agent
-from examples.copy_creator.agents.quality_assurance_agent import quality_assurance_agent
+from examples.copy_creator.factory import get_copy_creator
 
 
 # PROMPT CONTENT PLACEHOLDER
@@ -69,20 +58,4 @@ Se faltar alguma informação, pergunte ao usuário.
 
 
 # Create the graph
-graph = create_deep_agent(
-    tools=[
-        internet_search,
-        get_validated_copies,
-        get_copywriting_formulas,
-        get_market_data_templates,
-        get_base_copys
-    ],
-    instructions=COPY_CREATOR_INSTRUCTIONS,
-    model=get_default_model(),
-    subagents=[
-        market_research_agent,
-        hook_strategy_agent,
-        copy_creation_agent,
-        quality_assurance_agent
-    ]
-)
+graph = get_copy_creator(COPY_CREATOR_INSTRUCTIONS)
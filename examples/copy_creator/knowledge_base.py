@@ -0,0 +1,213 @@
+"""Shared, cached access to the Copy Creator knowledge base files."""
+
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_WORD = re.compile(r"\w+")
+
+
+class KnowledgeBaseLoader:
+    """
+    Reads knowledge base files once and serves them from memory.
+
+    A cached file is invalidated when its modification time or size changes,
+    so edits to the markdown files are picked up without a restart. To keep
+    tool calls free of filesystem I/O, a file is checked at most once every
+    `check_interval` seconds; set it to 0 to check on every read.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        # path -> (checked_at, (mtime_ns, size), content)
+        self._files: dict[Path, tuple[float, tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def read(self, path: Union[str, Path]) -> str:
+        """
+        Return the content of a knowledge base file.
+
+        Args:
+            path: Path of the markdown file
+
+        Returns:
+            File content
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        path = Path(path)
+        now = time.monotonic()
+        cached = self._files.get(path)
+        if cached is not None and now - cached[0] < self.check_interval:
+            return cached[2]
+
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if cached is not None and cached[1] == version:
+            content = cached[2]
+        else:
+            content = path.read_text(encoding="utf-8")
+        with self._lock:
+            self._files[path] = (now, version, content)
+        return content
+
+    def clear(self) -> None:
+        """Drop every cached file."""
+        with self._lock:
+            self._files.clear()
+
+
+@dataclass(frozen=True)
+class Section:
+    """A headed section of a knowledge base file."""
+
+    source: str
+    title: str
+    text: str
+
+
+def split_sections(content: str, source: str) -> list[Section]:
+    """
+    Split markdown into sections at its headings.
+
+    A section runs from a heading to the next heading, whatever its level, and
+    is titled with the path of headings above it (e.g. "Formulas > Formula 1").
+    Level 1 headings are left out of titles, since they name the whole file.
+    Lines inside code fences are never treated as headings, and sections with
+    no content besides their heading are dropped.
+    """
+    sections = []
+    path: list[tuple[int, str]] = []
+    lines: list[str] = []
+    in_fence = False
+
+    def flush():
+        body = "\n".join(lines[1:] if path else lines).strip()
+        if body:
+            # The file's own title (level 1) adds nothing next to `source`
+            title = " > ".join(heading for level, heading in path if level > 1) or source
+            sections.append(Section(source, title, "\n".join(lines).strip()))
+
+    for line in content.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, match.group(2)))
+            lines = []
+        lines.append(line)
+    flush()
+    return sections
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase words with accents removed, so "Urgência" matches "urgencia"."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return _WORD.findall("".join(c for c in folded if not unicodedata.combining(c)))
+
+
+class KnowledgeBaseIndex:
+    """
+    BM25 index over the sections of a set of knowledge base files.
+
+    Files are read through `loader`, and the index is rebuilt whenever one of
+    them changes. Sections with identical text (e.g. a file copied under two
+    names) are indexed once.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[Union[str, Path]],
+        loader: Optional[KnowledgeBaseLoader] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.paths = [Path(p) for p in paths]
+        self.loader = loader if loader is not None else knowledge_base
+        self.k1 = k1
+        self.b = b
+        self._contents: list[Optional[str]] = []
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Rebuild the index if any file changed since it was built."""
+        contents = []
+        for path in self.paths:
+            try:
+                contents.append(self.loader.read(path))
+            except FileNotFoundError:
+                contents.append(None)
+        # The loader returns the cached string itself while a file is unchanged
+        if len(contents) == len(self._contents) and all(a is b for a, b in zip(contents, self._contents)):
+            return
+        with self._lock:
+            self._build(contents)
+
+    def _build(self, contents: list[Optional[str]]) -> None:
+        sections = []
+        seen = set()
+        for path, content in zip(self.paths, contents):
+            if content is None:
+                continue
+            for section in split_sections(content, path.name):
+                if section.text not in seen:
+                    seen.add(section.text)
+                    sections.append(section)
+
+        term_freqs = [Counter(tokenize(f"{s.title}\n{s.text}")) for s in sections]
+        lengths = [sum(tf.values()) for tf in term_freqs]
+        doc_freqs = Counter(term for tf in term_freqs for term in tf)
+        n = len(sections)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+        self._sections = sections
+        self._term_freqs = term_freqs
+        self._lengths = lengths
+        self._avg_length = sum(lengths) / n if n else 0.0
+        self._contents = contents
+
+    def search(self, query: str, k: int = 3) -> list[tuple[Section, float]]:
+        """
+        Return the `k` best matching sections for `query`, best first.
+
+        Args:
+            query: Free text query
+            k: Maximum number of sections to return
+
+        Returns:
+            (section, score) pairs; sections that share no term with the query are left out
+        """
+        self.refresh()
+        with self._lock:
+            sections, term_freqs, lengths = self._sections, self._term_freqs, self._lengths
+            idf, avg_length = self._idf, self._avg_length
+        terms = [t for t in set(tokenize(query)) if t in idf]
+        scores = []
+        for section, tf, length in zip(sections, term_freqs, lengths):
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    score += idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((section, score))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:k]
+
+
+# Shared by every tool and subagent in the process
+knowledge_base = KnowledgeBaseLoader()
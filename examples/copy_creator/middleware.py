@@ -0,0 +1,99 @@
+"""Structured copy results for the Copy Creator agent.
+
+Subagents submit each copy and its score through tools that write straight
+into the `copies` state channel, so callers read the final copies from state
+instead of scanning the files and audit text the agents wrote.
+"""
+
+from typing import Annotated, NotRequired, Optional
+
+from typing_extensions import TypedDict
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import InjectedToolCallId, tool
+from langgraph.types import Command
+
+from examples.copy_creator.models.copy_output import CopyObject
+
+
+class CopyFields(TypedDict, total=False):
+    """The submitted fields of one copy."""
+    content: str
+    score: float
+
+
+def copies_reducer(
+    left: Optional[dict[int, CopyFields]], right: Optional[dict[int, CopyFields]]
+) -> dict[int, CopyFields]:
+    """Merge copy updates by copy number.
+
+    Each update only carries the fields it sets (e.g. a score without the
+    content), so a copy and its score can be submitted by different agents and
+    in any order. The current mapping is never mutated in place.
+    """
+    if right is None:
+        return left or {}
+    if left is None:
+        return right
+    merged = dict(left)
+    for number, fields in right.items():
+        merged[number] = {**merged.get(number, {}), **fields}
+    return merged
+
+
+class CopyState(AgentState):
+    copies: Annotated[NotRequired[dict[int, CopyFields]], copies_reducer]
+
+
+@tool
+def submit_copy(number: int, content: str, tool_call_id: Annotated[str, InjectedToolCallId]) -> Command:
+    """
+    Submit the final text of a copy. Call it once per copy, after saving it, with the complete copy text.
+    Submitting the same number again replaces that copy (e.g. when refining it).
+
+    Args:
+        number: Copy number, from 1 to N
+        content: The complete copy, exactly as it should be delivered
+    """
+    return Command(
+        update={
+            "copies": {number: {"content": content}},
+            "messages": [ToolMessage(f"Submitted copy {number}", tool_call_id=tool_call_id)],
+        }
+    )
+
+
+@tool
+def submit_score(number: int, score: float, tool_call_id: Annotated[str, InjectedToolCallId]) -> Command:
+    """
+    Submit the final quality score of a copy. Call it once per audited copy.
+
+    Args:
+        number: Copy number, from 1 to N
+        score: Final score, from 1 to 10
+    """
+    return Command(
+        update={
+            "copies": {number: {"score": max(1.0, min(10.0, score))}},
+            "messages": [ToolMessage(f"Submitted score {score}/10 for copy {number}", tool_call_id=tool_call_id)],
+        }
+    )
+
+
+class CopyOutputMiddleware(AgentMiddleware):
+    """Adds the `copies` state channel and the tools that fill it."""
+
+    state_schema = CopyState
+    # Updates to different fields or copies merge in any order, so these never need to wait for each other
+    tools = [submit_copy, submit_score]
+
+
+def get_copies(state: dict) -> list[CopyObject]:
+    """Return the submitted copies in order, leaving out numbers that only received a score."""
+    copies = state.get("copies") or {}
+    return [
+        {"id": f"copy-{number}", "content": copies[number]["content"], "score": copies[number].get("score")}
+        for number in sorted(copies)
+        if copies[number].get("content")
+    ]
@@ -4,6 +4,7 @@ Servidor alternativo para Copy Creator usando uvicorn diretamente.
 Use este se langgraph CLI não funcionar.
 """
 
+import json
 import os
 import sys
 import uvicorn
@@ -44,7 +45,9 @@ port = int(os.environ.get("PORT", 8000))
 # Create simple FastAPI app wrapping the graph
 try:
     from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
     from langserve import add_routes
+    from examples.copy_creator.agent import stream_copies
 
     app = FastAPI(
         title="Copy Creator Agent",
@@ -55,6 +58,23 @@ try:
     # Add graph routes
     add_routes(app, graph, path="/copy_creator")
 
+    # Server-sent events: each copy and score as soon as it is produced, then the final result
+    @app.post("/copy_creator/stream_copies")
+    async def stream_copies_endpoint(input_data: dict):
+        async def events():
+            try:
+                async for event in stream_copies(input_data):
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            # Keep proxies from buffering the stream
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     # Health check
     @app.get("/info")
     async def info():
@@ -3,13 +3,24 @@
 import os
 from pathlib import Path
 from langchain_core.tools import tool
-from typing import Optional
+
+from deepagents.cache import ToolResultCache, cache_tool
+from deepagents.tools import declare_side_effects
+from examples.copy_creator.knowledge_base import KnowledgeBaseIndex, knowledge_base
 
 
 # Get current directory for relative paths
 CURRENT_DIR = Path(__file__).parent
 KNOWLEDGE_BASE_DIR = CURRENT_DIR / "knowledge-base"
 
+# Built once at startup; rebuilt only when one of the files changes
+KNOWLEDGE_BASE_INDEX = KnowledgeBaseIndex([
+    KNOWLEDGE_BASE_DIR / "validated-copies.md",
+    KNOWLEDGE_BASE_DIR / "copywriting-formulas.md",
+    KNOWLEDGE_BASE_DIR / "market-data-templates.md",
+    CURRENT_DIR / "base-copys.md",
+])
+
 
 @tool
 def internet_search(query: str, max_results: int = 5) -> str:
@@ -28,6 +39,27 @@ def internet_search(query: str, max_results: int = 5) -> str:
     return f"Search results for: {query}\n(Tavily API integration needed)"
 
 
+@tool
+def search_knowledge_base(query: str, k: int = 3) -> str:
+    """
+    Busca na base de conhecimento (copies validadas, fórmulas de copywriting, gatilhos, hooks e templates de mercado)
+    e retorna apenas as seções mais relevantes. Prefira esta ferramenta a carregar arquivos inteiros.
+
+    Args:
+        query: O que procurar, por exemplo "copies de pavers com desconto" ou "hooks de urgência"
+        k: Número máximo de seções retornadas
+
+    Returns:
+        The best matching sections, best first
+    """
+    results = KNOWLEDGE_BASE_INDEX.search(query, k=max(1, k))
+    if not results:
+        return f"Nenhuma seção encontrada para: {query}"
+    return "\n\n---\n\n".join(
+        f"[{section.source} › {section.title}]\n{section.text}" for section, _ in results
+    )
+
+
 @tool
 def get_validated_copies() -> str:
     """
@@ -39,13 +71,10 @@ def get_validated_copies() -> str:
     """
     file_path = KNOWLEDGE_BASE_DIR / "validated-copies.md"
 
-    if not file_path.exists():
-        return "Arquivo de copies validadas não encontrado. Verifique se o arquivo validated-copies.md existe na pasta knowledge-base."
-
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        return content
+        return knowledge_base.read(file_path)
+    except FileNotFoundError:
+        return "Arquivo de copies validadas não encontrado. Verifique se o arquivo validated-copies.md existe na pasta knowledge-base."
     except Exception as e:
         return f"Erro ao ler arquivo de copies validadas: {str(e)}"
 
@@ -61,13 +90,10 @@ def get_copywriting_formulas() -> str:
     """
     file_path = KNOWLEDGE_BASE_DIR / "copywriting-formulas.md"
 
-    if not file_path.exists():
-        return "Arquivo de fórmulas de copywriting não encontrado. Verifique se o arquivo copywriting-formulas.md existe na pasta knowledge-base."
-
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        return content
+        return knowledge_base.read(file_path)
+    except FileNotFoundError:
+        return "Arquivo de fórmulas de copywriting não encontrado. Verifique se o arquivo copywriting-formulas.md existe na pasta knowledge-base."
     except Exception as e:
         return f"Erro ao ler arquivo de fórmulas: {str(e)}"
 
@@ -83,13 +109,10 @@ def get_market_data_templates() -> str:
     """
     file_path = KNOWLEDGE_BASE_DIR / "market-data-templates.md"
 
-    if not file_path.exists():
-        return "Arquivo de templates de mercado não encontrado. Verifique se o arquivo market-data-templates.md existe na pasta knowledge-base."
-
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        return content
+        return knowledge_base.read(file_path)
+    except FileNotFoundError:
+        return "Arquivo de templates de mercado não encontrado. Verifique se o arquivo market-data-templates.md existe na pasta knowledge-base."
     except Exception as e:
         return f"Erro ao ler templates de mercado: {str(e)}"
 
@@ -105,12 +128,25 @@ def get_base_copys() -> str:
     """
     file_path = CURRENT_DIR / "base-copys.md"
 
-    if not file_path.exists():
-        return "Arquivo base-copys.md não encontrado. Verifique se o arquivo existe na pasta copy_creator."
-
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        return content
+        return knowledge_base.read(file_path)
+    except FileNotFoundError:
+        return "Arquivo base-copys.md não encontrado. Verifique se o arquivo existe na pasta copy_creator."
     except Exception as e:
         return f"Erro ao ler base-copys.md: {str(e)}"
+
+
+# Searches repeat across runs and subagents; set COPY_CREATOR_TOOL_CACHE to a file to keep results across restarts
+RESEARCH_CACHE = ToolResultCache(ttl=24 * 3600, path=os.getenv("COPY_CREATOR_TOOL_CACHE"))
+internet_search = cache_tool(internet_search, RESEARCH_CACHE)
+
+# Read-only: calls to these in the same turn can always run concurrently
+for _tool in (
+    internet_search,
+    search_knowledge_base,
+    get_validated_copies,
+    get_copywriting_formulas,
+    get_market_data_templates,
+    get_base_copys,
+):
+    declare_side_effects(_tool, side_effect_free=True)
@@ -1,5 +1,60 @@
-from deepagents.graph import create_deep_agent, async_create_deep_agent
-from deepagents.middleware import PlanningMiddleware, FilesystemMiddleware, SubAgentMiddleware
-from deepagents.state import DeepAgentState
-from deepagents.types import SubAgent, CustomSubAgent
-from deepagents.model import get_default_model
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from deepagents.graph import create_deep_agent, async_create_deep_agent
+    from deepagents.middleware import PlanningMiddleware, FilesystemMiddleware, SubAgentMiddleware, ToolResultCompactionMiddleware, ToolCallSchedulingMiddleware, ModelCacheMiddleware
+    from deepagents.tools import declare_side_effects
+    from deepagents.state import DeepAgentState
+    from deepagents.types import SubAgent, CustomSubAgent, SummarizationConfig
+    from deepagents.model import get_default_model, get_chat_model
+    from deepagents.cache import ToolResultCache, ModelResponseCache, cache_tool
+    from deepagents.tracing import Tracer, Span, JSONLSpanExporter, OpenTelemetrySpanExporter
+    from deepagents.backends import FilesystemBackend, InMemoryBackend, DiskBackend
+
+# Exports are imported on first access, so `import deepagents` (and importing one
+# submodule) does not load LangGraph, LangChain and every middleware up front
+_EXPORTS = {
+    "create_deep_agent": "deepagents.graph",
+    "async_create_deep_agent": "deepagents.graph",
+    "PlanningMiddleware": "deepagents.middleware",
+    "FilesystemMiddleware": "deepagents.middleware",
+    "SubAgentMiddleware": "deepagents.middleware",
+    "ToolResultCompactionMiddleware": "deepagents.middleware",
+    "ToolCallSchedulingMiddleware": "deepagents.middleware",
+    "ModelCacheMiddleware": "deepagents.middleware",
+    "declare_side_effects": "deepagents.tools",
+    "DeepAgentState": "deepagents.state",
+    "SubAgent": "deepagents.types",
+    "CustomSubAgent": "deepagents.types",
+    "SummarizationConfig": "deepagents.types",
+    "get_default_model": "deepagents.model",
+    "get_chat_model": "deepagents.model",
+    "ToolResultCache": "deepagents.cache",
+    "ModelResponseCache": "deepagents.cache",
+    "cache_tool": "deepagents.cache",
+    "Tracer": "deepagents.tracing",
+    "Span": "deepagents.tracing",
+    "JSONLSpanExporter": "deepagents.tracing",
+    "OpenTelemetrySpanExporter": "deepagents.tracing",
+    "FilesystemBackend": "deepagents.backends",
+    "InMemoryBackend": "deepagents.backends",
+    "DiskBackend": "deepagents.backends",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module), name)
+    # Cache it, so later lookups skip this function
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
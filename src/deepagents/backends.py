@@ -0,0 +1,258 @@
+"""Storage backends for the virtual filesystem.
+
+The `files` state channel maps each path to a string value. A backend decides
+what that value is: the file content itself (`InMemoryBackend`, the default) or
+a small reference to content kept outside of graph state (`DiskBackend`).
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from itertools import accumulate
+from operator import add
+from collections import OrderedDict
+from typing import Hashable, Optional, Union
+
+# Line boundaries as recognised by `str.splitlines`, for UTF-8 encoded bytes
+_LINE_BREAK_BYTES = re.compile(b"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]")
+_NON_WHITESPACE = re.compile(r"\S")
+_NON_WHITESPACE_BYTES = re.compile(rb"\S")
+
+
+class LineIndex:
+    """Offsets of every line in a file's content.
+
+    Built with a single scan of the content, after which any range of lines can
+    be sliced out without splitting the whole file. Lines are split the same way
+    as `str.splitlines`. The source may be a `str` or a UTF-8 encoded buffer
+    such as a memory map, in which case only the requested lines are decoded.
+    """
+
+    __slots__ = ("source", "starts", "ends", "is_blank")
+
+    def __init__(self, source: Union[str, bytes, mmap.mmap]) -> None:
+        if isinstance(source, str):
+            # splitlines and accumulate run in C, which is much faster than scanning in Python
+            starts = array("q", accumulate(map(len, source.splitlines(keepends=True)), initial=0))
+            starts.pop()
+            ends = array("q", map(add, starts, map(len, source.splitlines())))
+            self.is_blank = _NON_WHITESPACE.search(source) is None
+        else:
+            # bytes.splitlines only knows \n and \r, so match str.splitlines explicitly
+            starts = array("q")
+            ends = array("q")
+            start = 0
+            for match in _LINE_BREAK_BYTES.finditer(source):
+                starts.append(start)
+                ends.append(match.start())
+                start = match.end()
+            if start < len(source):
+                starts.append(start)
+                ends.append(len(source))
+            self.is_blank = _NON_WHITESPACE_BYTES.search(source) is None
+        self.source = source
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def lines(self, start: int, stop: int) -> list[str]:
+        """Return lines `start` up to (not including) `stop`."""
+        source = self.source
+        lines = [source[s:e] for s, e in zip(self.starts[start:stop], self.ends[start:stop])]
+        if isinstance(source, str):
+            return lines
+        return [line.decode("utf-8", errors="replace") for line in lines]
+
+
+class FilesystemBackend(ABC):
+    """Translates between file contents and the values kept in `files` state.
+
+    Line indexes for paged reads are cached, and an index keeps the content it
+    was built from alive (for `InMemoryBackend`, the file text itself). A
+    backend usually serves every run in the process (the default tools share
+    one), so the cache holds files from any run until they are evicted: at most
+    `max_line_indexes` of them and `max_line_index_chars` characters in total,
+    except that the most recently used index is always kept, even when it alone
+    is over budget, so that paging through one large file does not rescan it on
+    every read. Pass `max_line_indexes=0` to not cache at all, or call
+    `clear_line_indexes`.
+    """
+
+    def __init__(self, max_line_indexes: int = 128, max_line_index_chars: int = 16 * 2**20) -> None:
+        self.max_line_indexes = max_line_indexes
+        self.max_line_index_chars = max_line_index_chars
+        self._line_indexes: OrderedDict[Hashable, tuple[str, LineIndex]] = OrderedDict()
+        self._line_index_chars = 0
+        self._line_index_lock = threading.Lock()
+
+    @abstractmethod
+    def store(self, content: str) -> str:
+        """Persist `content` and return the value to put in state for it."""
+
+    @abstractmethod
+    def load(self, value: str) -> str:
+        """Return the file content for a value previously put in state."""
+
+    def read(self, files: dict[str, str], file_path: str) -> Optional[str]:
+        """Return the content of `file_path`, or None if it does not exist."""
+        if file_path not in files:
+            return None
+        return self.load(files[file_path])
+
+    def materialize(self, files: dict[str, str]) -> dict[str, str]:
+        """Resolve every value in `files` to its content, e.g. for a final result."""
+        return {path: self.load(value) for path, value in files.items()}
+
+    def line_index(self, value: str) -> LineIndex:
+        """Return the line index for a value in state, building it on first use.
+
+        Values are immutable, so an index never goes stale: writes and edits
+        produce a new value and therefore a new index. Old indexes are evicted
+        least-recently-used first.
+        """
+        key = self._line_index_key(value)
+        with self._line_index_lock:
+            cached = self._line_indexes.get(key)
+            if cached is not None:
+                self._line_indexes.move_to_end(key)
+                return cached[1]
+        index = LineIndex(self._line_index_source(value))
+        if self.max_line_indexes <= 0:
+            return index
+        with self._line_index_lock:
+            # Keep the value alive alongside its index so that `id(value)` keys stay unique
+            previous = self._line_indexes.pop(key, None)
+            if previous is not None:
+                self._line_index_chars -= len(previous[1].source)
+            self._line_indexes[key] = (value, index)
+            self._line_index_chars += len(index.source)
+            while len(self._line_indexes) > 1 and (
+                len(self._line_indexes) > self.max_line_indexes
+                or self._line_index_chars > self.max_line_index_chars
+            ):
+                _, (_, evicted) = self._line_indexes.popitem(last=False)
+                self._line_index_chars -= len(evicted.source)
+        return index
+
+    def clear_line_indexes(self) -> None:
+        """Drop every cached line index, releasing the contents they keep alive."""
+        with self._line_index_lock:
+            self._line_indexes.clear()
+            self._line_index_chars = 0
+
+    def _line_index_key(self, value: str) -> Hashable:
+        # Values are usually large strings: key on identity rather than rehashing content
+        return id(value)
+
+    def _line_index_source(self, value: str) -> Union[str, bytes, mmap.mmap]:
+        return self.load(value)
+
+
+class InMemoryBackend(FilesystemBackend):
+    """Keeps file contents directly in graph state."""
+
+    def store(self, content: str) -> str:
+        return content
+
+    def load(self, value: str) -> str:
+        return value
+
+
+class DiskBackend(FilesystemBackend):
+    """Content-addressed blob store on local disk.
+
+    Files are written once per distinct content under `root_dir` and state only
+    holds `blob:sha256:<digest>` references, so checkpoints stay small no matter
+    how large the files get. Blobs are read through memory maps, letting the OS
+    page them in and out instead of keeping every file in process memory.
+
+    Content shorter than `inline_threshold` characters is kept inline in state,
+    since a reference would not be meaningfully smaller. Values that are not
+    references (e.g. files passed in by the caller) are treated as inline content.
+    Blobs are never deleted by the backend; clean up `root_dir` when a session's
+    checkpoints are no longer needed.
+    """
+
+    REF_PREFIX = "blob:sha256:"
+
+    def __init__(
+        self,
+        root_dir: str,
+        inline_threshold: int = 1024,
+        max_open_blobs: int = 256,
+        max_line_indexes: int = 128,
+        max_line_index_chars: int = 16 * 2**20,
+    ) -> None:
+        super().__init__(max_line_indexes, max_line_index_chars)
+        self.root_dir = root_dir
+        self.inline_threshold = inline_threshold
+        self.max_open_blobs = max_open_blobs
+        self._blobs: OrderedDict[str, mmap.mmap] = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def store(self, content: str) -> str:
+        if len(content) < self.inline_threshold and not content.startswith(self.REF_PREFIX):
+            return content
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial blob
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return self.REF_PREFIX + digest
+
+    def load(self, value: str) -> str:
+        if not value.startswith(self.REF_PREFIX):
+            return value
+        with self._lock:
+            blob = self._open_blob(value[len(self.REF_PREFIX):])
+            data = blob[:] if blob is not None else b""
+        return data.decode("utf-8")
+
+    def _line_index_key(self, value: str) -> Hashable:
+        if value.startswith(self.REF_PREFIX):
+            # References are content addressed, so equal references share an index
+            return value
+        return super()._line_index_key(value)
+
+    def _line_index_source(self, value: str) -> Union[str, bytes, mmap.mmap]:
+        if not value.startswith(self.REF_PREFIX):
+            return value
+        with self._lock:
+            blob = self._open_blob(value[len(self.REF_PREFIX):])
+        # Index the map directly so paged reads only decode the lines they return
+        return blob if blob is not None else b""
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root_dir, digest[:2], digest[2:])
+
+    def _open_blob(self, digest: str) -> Optional[mmap.mmap]:
+        """Return a read-only map of a blob, or None for an empty blob.
+
+        Must be called with `self._lock` held. Evicted maps are not closed
+        explicitly; they are released once no line index references them.
+        """
+        blob = self._blobs.get(digest)
+        if blob is not None:
+            self._blobs.move_to_end(digest)
+            return blob
+        with open(self._blob_path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._blobs[digest] = blob
+        if len(self._blobs) > self.max_open_blobs:
+            self._blobs.popitem(last=False)
+        return blob
@@ -0,0 +1,216 @@
+"""Caching of tool results and model responses."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Sequence, Union
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel
+
+
+class ToolResultCache:
+    """LRU cache of tool results, optionally persisted to SQLite.
+
+    Results live in memory, up to `maxsize` entries. With a `path`, they are
+    also written to a SQLite database there, so they survive restarts and are
+    shared by every process using the same file. Entries expire `ttl` seconds
+    after being stored; None keeps them until evicted.
+    """
+
+    table = "tool_results"
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expires_at, result)
+        self._results: OrderedDict[str, tuple[Optional[float], str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            # Only caches that persist need SQLite
+            import sqlite3
+
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached result for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    f"SELECT expires_at, result FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = row
+                    self._remember(key, entry)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at is not None and expires_at <= now:
+                self._forget(key)
+                return None
+            self._results.move_to_end(key)
+            return result
+
+    def set(self, key: str, result: str, ttl: Optional[float] = None) -> None:
+        """Store `result` under `key` for `ttl` seconds, or the cache's default `ttl`."""
+        ttl = self.ttl if ttl is None else ttl
+        entry = (None if ttl is None else time.time() + ttl, result)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, result, expires_at) VALUES (?, ?, ?)",
+                    (key, result, entry[0]),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop every cached result, including persisted ones."""
+        with self._lock:
+            self._results.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def _remember(self, key: str, entry: tuple[Optional[float], str]) -> None:
+        self._results[key] = entry
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def _forget(self, key: str) -> None:
+        self._results.pop(key, None)
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._db.commit()
+
+
+class ModelResponseCache(BaseCache):
+    """Cache of chat model responses, optionally persisted to SQLite.
+
+    Used as a chat model's `cache` (see `ModelCacheMiddleware`), so responses
+    are keyed on everything sent to the model: system prompt, messages, bound
+    tool schemas and model settings. Storage works like `ToolResultCache`.
+    Message ids are not stored, so a replayed response is a new message.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self._responses = _ModelResponseStore(maxsize=maxsize, ttl=ttl, path=path)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[list[Generation]]:
+        cached = self._responses.get(self._key(prompt, llm_string))
+        if cached is None:
+            return None
+        return [ChatGeneration(message=message) for message in messages_from_dict(json.loads(cached))]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if not all(isinstance(generation, ChatGeneration) for generation in return_val):
+            return
+        messages = [message_to_dict(g.message.model_copy(update={"id": None})) for g in return_val]
+        self._responses.set(self._key(prompt, llm_string), json.dumps(messages))
+
+    def clear(self, **kwargs: Any) -> None:
+        self._responses.clear()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        try:
+            messages = json.loads(prompt)
+        except ValueError:
+            messages = None
+        if isinstance(messages, list):
+            # Usage and response metadata are never sent to the model, and differ between
+            # a response and its replay (replays report no cost)
+            for message in messages:
+                kwargs = message.get("kwargs") if isinstance(message, dict) else None
+                if isinstance(kwargs, dict):
+                    kwargs.pop("usage_metadata", None)
+                    kwargs.pop("response_metadata", None)
+            prompt = json.dumps(messages, sort_keys=True)
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class _ModelResponseStore(ToolResultCache):
+    table = "model_responses"
+
+
+def _cache_key(tool: BaseTool, args: dict[str, Any]) -> str:
+    # Fill in defaults, so `search("x")` and `search("x", max_results=5)` share an entry
+    if isinstance(tool.args_schema, type) and issubclass(tool.args_schema, BaseModel):
+        args = tool.args_schema.model_validate(args).model_dump()
+    payload = json.dumps([tool.name, args], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_tool(
+    tool: BaseTool,
+    cache: Optional[ToolResultCache] = None,
+    ttl: Optional[float] = None,
+) -> BaseTool:
+    """Wrap a tool so its results are cached by tool name and arguments.
+
+    Only wrap tools whose result depends on their arguments alone (no injected
+    state, no side effects). The wrapper keeps the tool's name, description and
+    arguments, so it can be passed to `create_deep_agent(tools=...)` and named
+    in `SubAgent.tools` like the original. Results that are not strings (e.g.
+    state updates) are returned as is and never cached.
+
+    Args:
+        tool: The tool to cache.
+        cache: The ToolResultCache to store results in; share one between tools
+            and agents to share results. Defaults to a new in-memory cache.
+        ttl: Seconds before a result of this tool expires; defaults to the cache's `ttl`.
+    """
+    cache = cache if cache is not None else ToolResultCache()
+
+    def cached(**kwargs: Any) -> Any:
+        key = _cache_key(tool, kwargs)
+        result = cache.get(key)
+        if result is None:
+            result = tool.invoke(kwargs)
+            if isinstance(result, str):
+                cache.set(key, result, ttl)
+        return result
+
+    async def acached(**kwargs: Any) -> Any:
+        key = _cache_key(tool, kwargs)
+        result = cache.get(key)
+        if result is None:
+            result = await tool.ainvoke(kwargs)
+            if isinstance(result, str):
+                cache.set(key, result, ttl)
+        return result
+
+    return StructuredTool.from_function(
+        func=cached,
+        coroutine=acached,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        infer_schema=False,
+        return_direct=tool.return_direct,
+        metadata=tool.metadata,
+    )
@@ -1,15 +1,21 @@
-from typing import Sequence, Union, Callable, Any, Type, Optional
+from typing import TYPE_CHECKING, Sequence, Union, Callable, Any, Type, Optional
 from langchain_core.tools import BaseTool
 from langchain_core.language_models import LanguageModelLike
 from langgraph.types import Checkpointer
 from langchain.agents import create_agent
-from langchain.agents.middleware import AgentMiddleware, SummarizationMiddleware, HumanInTheLoopMiddleware
+from langchain.agents.middleware import AgentMiddleware, HumanInTheLoopMiddleware
 from langchain.agents.middleware.human_in_the_loop import ToolConfig
 from langchain.agents.middleware.prompt_caching import AnthropicPromptCachingMiddleware
-from deepagents.middleware import PlanningMiddleware, FilesystemMiddleware, SubAgentMiddleware
+from deepagents.middleware import PlanningMiddleware, FilesystemMiddleware, SubAgentMiddleware, ModelCacheMiddleware, _with_tool_call_scheduling
 from deepagents.prompts import BASE_AGENT_PROMPT
-from deepagents.model import get_default_model
-from deepagents.types import SubAgent, CustomSubAgent
+from deepagents.model import get_default_model, get_chat_model
+from deepagents.types import SubAgent, CustomSubAgent, SummarizationConfig
+from deepagents.backends import FilesystemBackend
+
+if TYPE_CHECKING:
+    # Only needed when a caller passes one; summarization is imported when an agent is built
+    from deepagents.cache import ModelResponseCache
+    from deepagents.tracing import Tracer
 
 def agent_builder(
     tools: Sequence[Union[BaseTool, Callable, dict[str, Any]]],
@@ -20,27 +26,37 @@ def agent_builder(
     subagents: Optional[list[SubAgent | CustomSubAgent]] = None,
     context_schema: Optional[Type[Any]] = None,
     checkpointer: Optional[Checkpointer] = None,
+    filesystem_backend: Optional[FilesystemBackend] = None,
+    summarization: Optional[SummarizationConfig] = None,
+    model_cache: Optional["ModelResponseCache"] = None,
+    tracer: Optional["Tracer"] = None,
     is_async: bool = False,
 ):
+    from deepagents.summarization import create_summarization_middleware
+
     if model is None:
         model = get_default_model()
+    elif isinstance(model, str):
+        # Resolve once so the agent, its subagents and summarization share one client
+        model = get_chat_model(model=model)
 
     deepagent_middleware = [
         PlanningMiddleware(),
-        FilesystemMiddleware(),
+        FilesystemMiddleware(backend=filesystem_backend),
         SubAgentMiddleware(
             default_subagent_tools=tools,   # NOTE: These tools are piped to the general-purpose subagent.
             subagents=subagents if subagents is not None else [],
             model=model,
             is_async=is_async,
+            filesystem_backend=filesystem_backend,
+            summarization=summarization,
+            model_cache=model_cache,
         ),
-        SummarizationMiddleware(
-            model=model,
-            max_tokens_before_summary=120000,
-            messages_to_keep=20,
-        ),
+        create_summarization_middleware(model, summarization),
         AnthropicPromptCachingMiddleware(ttl="5m", unsupported_model_behavior="ignore")
     ]
+    if model_cache is not None:
+        deepagent_middleware.append(ModelCacheMiddleware(model_cache))
     # Add tool interrupt config if provided
     if tool_configs is not None:
         deepagent_middleware.append(HumanInTheLoopMiddleware(interrupt_on=tool_configs))
@@ -48,14 +64,19 @@ def agent_builder(
     if middleware is not None:
         deepagent_middleware.extend(middleware)
 
-    return create_agent(
+    agent = create_agent(
         model,
         prompt=instructions + "\n\n" + BASE_AGENT_PROMPT,
         tools=tools,
-        middleware=deepagent_middleware,
+        # Tool calls that change state run one after another, the rest concurrently
+        middleware=_with_tool_call_scheduling(tools, deepagent_middleware),
         context_schema=context_schema,
         checkpointer=checkpointer,
     )
+    if tracer is not None:
+        # Subagents run inside the task tool with the same callbacks, so they are traced too
+        agent = agent.with_config({"callbacks": [tracer]})
+    return agent
 
 def create_deep_agent(
     tools: Sequence[Union[BaseTool, Callable, dict[str, Any]]] = [],
@@ -66,6 +87,10 @@ def create_deep_agent(
     context_schema: Optional[Type[Any]] = None,
     checkpointer: Optional[Checkpointer] = None,
     tool_configs: Optional[dict[str, bool | ToolConfig]] = None,
+    filesystem_backend: Optional[FilesystemBackend] = None,
+    summarization: Optional[SummarizationConfig] = None,
+    model_cache: Optional["ModelResponseCache"] = None,
+    tracer: Optional["Tracer"] = None,
 ):
     """Create a deep agent.
     This agent will by default have access to a tool to write todos (write_todos),
@@ -80,12 +105,21 @@ def create_deep_agent(
                 - `name`
                 - `description` (used by the main agent to decide whether to call the sub agent)
                 - `prompt` (used as the system prompt in the subagent)
-                - (optional) `tools`
+                - (optional) `tools` (tool instances, or names of tools passed in `tools`)
                 - (optional) `model` (either a LanguageModelLike instance or dict settings)
                 - (optional) `middleware` (list of AgentMiddleware)
+                - (optional) `summarization` (SummarizationConfig, defaults to the main agent's)
         context_schema: The schema of the deep agent.
         checkpointer: Optional checkpointer for persisting agent state between runs.
         tool_configs: Optional Dict[str, HumanInTheLoopConfig] mapping tool names to interrupt configs.
+        filesystem_backend: Optional FilesystemBackend that stores file contents. Defaults to
+            keeping them in the `files` state key.
+        summarization: Optional SummarizationConfig with the token threshold, number of messages
+            to keep and model used to summarize long conversations.
+        model_cache: Optional ModelResponseCache. When given, the agent and its subagents answer
+            model requests they have already made from the cache instead of calling the model.
+        tracer: Optional Tracer that records a span for every model call, tool call and subagent
+            delegation of each run, including those of subagents, and exports them when the run ends.
     """
     return agent_builder(
         tools=tools,
@@ -96,6 +130,10 @@ def create_deep_agent(
         context_schema=context_schema,
         checkpointer=checkpointer,
         tool_configs=tool_configs,
+        filesystem_backend=filesystem_backend,
+        summarization=summarization,
+        model_cache=model_cache,
+        tracer=tracer,
         is_async=False,
     )
 
@@ -108,6 +146,10 @@ def async_create_deep_agent(
     context_schema: Optional[Type[Any]] = None,
     checkpointer: Optional[Checkpointer] = None,
     tool_configs: Optional[dict[str, bool | ToolConfig]] = None,
+    filesystem_backend: Optional[FilesystemBackend] = None,
+    summarization: Optional[SummarizationConfig] = None,
+    model_cache: Optional["ModelResponseCache"] = None,
+    tracer: Optional["Tracer"] = None,
 ):
     """Create a deep agent.
     This agent will by default have access to a tool to write todos (write_todos),
@@ -122,12 +164,21 @@ def async_create_deep_agent(
                 - `name`
                 - `description` (used by the main agent to decide whether to call the sub agent)
                 - `prompt` (used as the system prompt in the subagent)
-                - (optional) `tools`
+                - (optional) `tools` (tool instances, or names of tools passed in `tools`)
                 - (optional) `model` (either a LanguageModelLike instance or dict settings)
                 - (optional) `middleware` (list of AgentMiddleware)
+                - (optional) `summarization` (SummarizationConfig, defaults to the main agent's)
         context_schema: The schema of the deep agent.
         checkpointer: Optional checkpointer for persisting agent state between runs.
         tool_configs: Optional Dict[str, HumanInTheLoopConfig] mapping tool names to interrupt configs.
+        filesystem_backend: Optional FilesystemBackend that stores file contents. Defaults to
+            keeping them in the `files` state key.
+        summarization: Optional SummarizationConfig with the token threshold, number of messages
+            to keep and model used to summarize long conversations.
+        model_cache: Optional ModelResponseCache. When given, the agent and its subagents answer
+            model requests they have already made from the cache instead of calling the model.
+        tracer: Optional Tracer that records a span for every model call, tool call and subagent
+            delegation of each run, including those of subagents, and exports them when the run ends.
     """
     return agent_builder(
         tools=tools,
@@ -138,5 +189,9 @@ def async_create_deep_agent(
         context_schema=context_schema,
         checkpointer=checkpointer,
         tool_configs=tool_configs,
+        filesystem_backend=filesystem_backend,
+        summarization=summarization,
+        model_cache=model_cache,
+        tracer=tracer,
         is_async=True,
     )
\ No newline at end of file
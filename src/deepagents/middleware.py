@@ -1,18 +1,45 @@
 """DeepAgents implemented as Middleware"""
 
+import asyncio
+import threading
+from collections.abc import Callable, Mapping
+from functools import cache, lru_cache, partial
+
 from langchain.agents import create_agent
 from langchain.agents.middleware import AgentMiddleware, AgentState, ModelRequest, SummarizationMiddleware
+from langchain.agents.middleware.types import PrivateStateAttr
 from langchain.agents.middleware.prompt_caching import AnthropicPromptCachingMiddleware
 from langchain_core.tools import BaseTool, tool, InjectedToolCallId
-from langchain_core.messages import ToolMessage
-from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import Runnable
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.errors import GraphBubbleUp
 from langgraph.types import Command
 from langchain.tools.tool_node import InjectedState
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated, Any, NotRequired, Optional, Sequence
 from deepagents.state import PlanningState, FilesystemState
-from deepagents.tools import write_todos, ls, read_file, write_file, edit_file
-from deepagents.prompts import WRITE_TODOS_SYSTEM_PROMPT, TASK_SYSTEM_PROMPT, FILESYSTEM_SYSTEM_PROMPT, TASK_TOOL_DESCRIPTION, BASE_AGENT_PROMPT
-from deepagents.types import SubAgent, CustomSubAgent
+from deepagents.tools import declare_side_effects, write_todos, update_todos, ls, read_file, write_file, edit_file, glob, grep, create_filesystem_tools
+from deepagents.backends import FilesystemBackend, InMemoryBackend
+from deepagents.model import get_chat_model
+from deepagents.prompts import WRITE_TODOS_SYSTEM_PROMPT, TASK_SYSTEM_PROMPT, FILESYSTEM_SYSTEM_PROMPT, TASK_TOOL_DESCRIPTION, PARALLEL_TASK_TOOL_DESCRIPTION, BASE_AGENT_PROMPT, SPILLED_TOOL_RESULT_MESSAGE
+from deepagents.types import SubAgent, CustomSubAgent, SubAgentTask, SummarizationConfig
+
+if TYPE_CHECKING:
+    from deepagents.cache import ModelResponseCache
+
+@lru_cache(maxsize=256)
+def _compose_system_prompt(system_prompt: Optional[str], section: str) -> str:
+    """Append a middleware's section to the system prompt.
+
+    The same inputs come back on every model call of an agent, so this returns
+    the same string object each turn instead of building a new multi-KB one.
+    Sections always follow the agent's prompt in middleware order, which keeps
+    the prompt byte-identical across turns for provider-side prompt caching.
+    """
+    if not system_prompt:
+        return section
+    return system_prompt + "\n\n" + section
 
 ###########################
 # Planning Middleware
@@ -20,10 +47,10 @@ from deepagents.types import SubAgent, CustomSubAgent
 
 class PlanningMiddleware(AgentMiddleware):
     state_schema = PlanningState
-    tools = [write_todos]
+    tools = [write_todos, update_todos]
 
     def modify_model_request(self, request: ModelRequest, agent_state: PlanningState) -> ModelRequest:
-        request.system_prompt = request.system_prompt + "\n\n" + WRITE_TODOS_SYSTEM_PROMPT
+        request.system_prompt = _compose_system_prompt(request.system_prompt, WRITE_TODOS_SYSTEM_PROMPT)
         return request
 
 ###########################
@@ -32,12 +59,202 @@ class PlanningMiddleware(AgentMiddleware):
 
 class FilesystemMiddleware(AgentMiddleware):
     state_schema = FilesystemState
-    tools = [ls, read_file, write_file, edit_file]
+    tools = [ls, read_file, write_file, edit_file, glob, grep]
+
+    def __init__(self, backend: Optional[FilesystemBackend] = None) -> None:
+        super().__init__()
+        if backend is not None:
+            self.tools = create_filesystem_tools(backend)
 
     def modify_model_request(self, request: ModelRequest, agent_state: FilesystemState) -> ModelRequest:
-        request.system_prompt = request.system_prompt + "\n\n" + FILESYSTEM_SYSTEM_PROMPT
+        request.system_prompt = _compose_system_prompt(request.system_prompt, FILESYSTEM_SYSTEM_PROMPT)
+        return request
+
+###########################
+# Tool Result Compaction Middleware
+###########################
+
+class ToolResultCompactionMiddleware(AgentMiddleware):
+    """Moves large tool results out of the message history and into `files`.
+
+    A tool result over `max_chars` characters is saved to
+    `/tool_outputs/<tool_call_id>.md` and its message is replaced, under the same
+    id, by a pointer to the file and a short preview. The model can page through
+    the full result with `read_file` instead of re-sending it on every call.
+    Results of `exclude_tools` (by default `read_file`, which already pages) are
+    never moved.
+    """
+
+    state_schema = FilesystemState
+
+    def __init__(
+        self,
+        max_chars: int = 8000,
+        preview_chars: int = 1000,
+        backend: Optional[FilesystemBackend] = None,
+        exclude_tools: tuple[str, ...] = ("read_file",),
+    ) -> None:
+        super().__init__()
+        self.max_chars = max_chars
+        self.preview_chars = preview_chars
+        # Must match the FilesystemMiddleware backend so read_file can load the files
+        self.backend = backend if backend is not None else InMemoryBackend()
+        self.exclude_tools = exclude_tools
+
+    def before_model(self, state: FilesystemState) -> dict | None:
+        current_files = state.get("files") or {}
+        files = {}
+        messages = []
+        for message in state["messages"]:
+            if not isinstance(message, ToolMessage) or message.id is None or message.name in self.exclude_tools:
+                continue
+            content = message.content
+            if not isinstance(content, str) or len(content) <= self.max_chars:
+                continue
+            file_path = f"/tool_outputs/{message.tool_call_id}.md"
+            if file_path in current_files:
+                # Already moved; this is the pointer message
+                continue
+            files[file_path] = self.backend.store(content)
+            pointer = SPILLED_TOOL_RESULT_MESSAGE.format(
+                num_chars=len(content),
+                num_lines=content.count("\n") + 1,
+                file_path=file_path,
+                preview=content[:self.preview_chars],
+            )
+            # Same id, so the reducer replaces the message where it is
+            messages.append(message.model_copy(update={"content": pointer}))
+        if not messages:
+            return None
+        return {"files": files, "messages": messages}
+
+###########################
+# Model Cache Middleware
+###########################
+
+class ModelCacheMiddleware(AgentMiddleware):
+    """Replays model responses for requests that were already made.
+
+    Requests are keyed on the system prompt, messages, tool schemas and model
+    settings, so a run that repeats an earlier one exactly (e.g. the same brief
+    in tests, benchmarks or QA loops) is answered from `cache` without calling
+    the provider. With a `path`-backed ModelResponseCache, replays work across
+    processes and without network access.
+    """
+
+    def __init__(self, cache: Optional["ModelResponseCache"] = None) -> None:
+        super().__init__()
+        if cache is None:
+            from deepagents.cache import ModelResponseCache
+
+            cache = ModelResponseCache()
+        self.cache = cache
+        # id(model) -> (model, copy of it using the cache); holding the model keeps its id unique
+        self._models: dict[int, tuple[BaseChatModel, BaseChatModel]] = {}
+        self._lock = threading.Lock()
+
+    def modify_model_request(self, request: ModelRequest, agent_state: AgentState) -> ModelRequest:
+        # Models configured with their own cache (or with caching disabled) are left alone
+        if isinstance(request.model, BaseChatModel) and request.model.cache is None:
+            request.model = self._cached_model(request.model)
         return request
 
+    def _cached_model(self, model: BaseChatModel) -> BaseChatModel:
+        cached = self._models.get(id(model))
+        if cached is None or cached[0] is not model:
+            with self._lock:
+                # A shallow copy shares the provider client with the original
+                cached = self._models[id(model)] = (model, model.model_copy(update={"cache": self.cache}))
+        return cached[1]
+
+###########################
+# Tool Call Scheduling Middleware
+###########################
+
+class ToolCallSchedulingState(AgentState):
+    # Tool calls from the last model turn that still have to run, one batch per entry
+    pending_tool_call_waves: NotRequired[Annotated[list[list[dict]], PrivateStateAttr]]
+
+
+class ToolCallSchedulingMiddleware(AgentMiddleware):
+    """Runs the tool calls of one model turn in waves instead of all at once.
+
+    Tool calls of a turn normally run concurrently against the same state, so
+    two state-changing calls (e.g. `write_file` then `edit_file` on that file)
+    would both see the state from before the turn, and one would lose. Tools
+    declare `side_effect_free` in their metadata (see `declare_side_effects`).
+    Calls are split, in the order the model made them, into waves that end at
+    the first call to a tool declared with side effects, so every declared call
+    sees the updates of the calls made before it. Calls in a wave run
+    concurrently; waves run one after another. Tools that declare nothing are
+    never the reason for a new wave. `task` and `parallel_task` hand the files
+    to subagents and return their changes, so they are declared with side
+    effects: a subagent sees the files written before it in the same turn.
+    Subagents meant to run at the same time go in one `parallel_task` call.
+
+    The model's message keeps the first wave; each later wave is replayed as a
+    tool-calling message before the model is called again.
+    """
+
+    state_schema = ToolCallSchedulingState
+    before_model_jump_to = ["tools"]
+
+    def __init__(self, tools: Sequence[BaseTool | Any]) -> None:
+        super().__init__()
+        declared = {
+            t.name: t.metadata["side_effect_free"]
+            for t in tools
+            if isinstance(t, BaseTool) and "side_effect_free" in (t.metadata or {})
+        }
+        self.declared_tools = set(declared)
+        self.serialized_tools = {name for name, side_effect_free in declared.items() if not side_effect_free}
+
+    def after_model(self, state: ToolCallSchedulingState) -> dict[str, Any] | None:
+        message = state["messages"][-1]
+        if not isinstance(message, AIMessage) or len(message.tool_calls) < 2:
+            return None
+        waves = [[]]
+        wave_has_side_effects = False
+        for tool_call in message.tool_calls:
+            if wave_has_side_effects and tool_call["name"] in self.declared_tools:
+                waves.append([])
+                wave_has_side_effects = False
+            waves[-1].append(tool_call)
+            wave_has_side_effects = wave_has_side_effects or tool_call["name"] in self.serialized_tools
+        if len(waves) == 1:
+            return None
+        first_wave_ids = {tool_call["id"] for tool_call in waves[0]}
+        content = message.content
+        if isinstance(content, list):
+            # Some providers also keep tool calls as content blocks
+            content = [
+                block
+                for block in content
+                if not (isinstance(block, dict) and block.get("type") == "tool_use" and block.get("id") not in first_wave_ids)
+            ]
+        return {
+            # Same id, so the message is replaced in place
+            "messages": [message.model_copy(update={"content": content, "tool_calls": waves[0]})],
+            "pending_tool_call_waves": waves[1:],
+        }
+
+    def before_model(self, state: ToolCallSchedulingState) -> dict[str, Any] | None:
+        waves = state.get("pending_tool_call_waves")
+        if not waves:
+            return None
+        return {
+            "messages": [AIMessage(content="", tool_calls=waves[0])],
+            "pending_tool_call_waves": waves[1:],
+            "jump_to": "tools",
+        }
+
+
+def _with_tool_call_scheduling(tools: Sequence[BaseTool | Any], middleware: list[AgentMiddleware]) -> list[AgentMiddleware]:
+    """Put a ToolCallSchedulingMiddleware for every tool of an agent first in its middleware."""
+    all_tools = [*tools, *(t for m in middleware for t in getattr(m, "tools", []))]
+    # First, so that its before_model hook runs before any other and can jump straight to the tools
+    return [ToolCallSchedulingMiddleware(all_tools), *middleware]
+
 ###########################
 # SubAgent Middleware
 ###########################
@@ -49,77 +266,147 @@ class SubAgentMiddleware(AgentMiddleware):
         subagents: list[SubAgent | CustomSubAgent] = [],
         model=None,
         is_async=False,
+        filesystem_backend: Optional[FilesystemBackend] = None,
+        max_concurrency: int = 4,
+        summarization: Optional[SummarizationConfig] = None,
+        model_cache: Optional["ModelResponseCache"] = None,
     ) -> None:
         super().__init__()
-        task_tool = create_task_tool(
-            default_subagent_tools=default_subagent_tools,
-            subagents=subagents,
-            model=model,
-            is_async=is_async,
-        )
-        self.tools = [task_tool]
+        agents = _get_agents(default_subagent_tools, subagents, model, filesystem_backend, summarization, model_cache)
+        self.tools = [
+            _create_task_tool(agents, subagents, is_async),
+            _create_parallel_task_tool(agents, subagents, is_async, max_concurrency),
+        ]
 
     def modify_model_request(self, request: ModelRequest, agent_state: AgentState) -> ModelRequest:
-        request.system_prompt = request.system_prompt + "\n\n" + TASK_SYSTEM_PROMPT
+        request.system_prompt = _compose_system_prompt(request.system_prompt, TASK_SYSTEM_PROMPT)
         return request
 
+class _LazySubAgentGraphs(Mapping):
+    """Subagent graphs by name, each compiled on first use and then reused.
+
+    Building a deep agent only records how to compile each subagent, so the
+    startup cost scales with the subagents a run actually delegates to.
+    """
+
+    def __init__(self, builders: dict[str, Callable[[], Runnable]]) -> None:
+        self._builders = builders
+        self._graphs: dict[str, Runnable] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Runnable:
+        graph = self._graphs.get(name)
+        if graph is None:
+            builder = self._builders[name]
+            with self._lock:
+                # Concurrent tasks may ask for the same subagent; only compile it once
+                graph = self._graphs.get(name)
+                if graph is None:
+                    graph = self._graphs[name] = builder()
+        return graph
+
+    def __iter__(self):
+        return iter(self._builders)
+
+    def __len__(self) -> int:
+        return len(self._builders)
+
+
 def _get_agents(
     default_subagent_tools: list[BaseTool],
     subagents: list[SubAgent | CustomSubAgent],
-    model
+    model,
+    filesystem_backend: Optional[FilesystemBackend] = None,
+    summarization: Optional[SummarizationConfig] = None,
+    model_cache: Optional["ModelResponseCache"] = None,
 ):
-    default_subagent_middleware = [
-        PlanningMiddleware(),
-        FilesystemMiddleware(),
-        # TODO: Add this back when fixed
-        SummarizationMiddleware(
-            model=model,
-            max_tokens_before_summary=120000,
-            messages_to_keep=20,
-        ),
-        AnthropicPromptCachingMiddleware(ttl="5m", unsupported_model_behavior="ignore"),
-    ]
-    agents = {
-        "general-purpose": create_agent(
+    from deepagents.summarization import create_summarization_middleware
+
+    def subagent_middleware(summarization_middleware: SummarizationMiddleware):
+        middleware = [
+            PlanningMiddleware(),
+            # Subagents share the parent's `files`, so they must read them the same way
+            FilesystemMiddleware(backend=filesystem_backend),
+            summarization_middleware,
+            AnthropicPromptCachingMiddleware(ttl="5m", unsupported_model_behavior="ignore"),
+        ]
+        if model_cache is not None:
+            middleware.append(ModelCacheMiddleware(model_cache))
+        return middleware
+
+    @cache
+    def default_subagent_middleware():
+        return subagent_middleware(create_summarization_middleware(model, summarization))
+
+    def build_general_purpose():
+        return create_agent(
             model,
             prompt=BASE_AGENT_PROMPT,
             tools=default_subagent_tools,
             checkpointer=False,
-            middleware=default_subagent_middleware
+            middleware=_with_tool_call_scheduling(default_subagent_tools, default_subagent_middleware()),
         )
-    }
-    for _agent in subagents:
-        if "graph" in _agent:
-            agents[_agent["name"]] = _agent["graph"]
-            continue
+
+    def build_subagent(_agent: SubAgent):
         if "tools" in _agent:
-            _tools = _agent["tools"]
+            _tools = _resolve_subagent_tools(_agent, default_subagent_tools)
         else:
             _tools = default_subagent_tools.copy()
         # Resolve per-subagent model: can be instance or dict
         if "model" in _agent:
             agent_model = _agent["model"]
             if isinstance(agent_model, dict):
-                # Dictionary settings - create model from config
-                sub_model = init_chat_model(**agent_model)
+                # Dictionary settings - shared with any agent using the same config
+                sub_model = get_chat_model(**agent_model)
             else:
                 # Model instance - use directly
                 sub_model = agent_model
         else:
             # Fallback to main model
             sub_model = model
-        if "middleware" in _agent:
-            _middleware = [*default_subagent_middleware, *_agent["middleware"]]
+        if "summarization" in _agent:
+            _middleware = subagent_middleware(create_summarization_middleware(sub_model, _agent["summarization"]))
         else:
-            _middleware = default_subagent_middleware
-        agents[_agent["name"]] = create_agent(
+            _middleware = default_subagent_middleware()
+        if "middleware" in _agent:
+            _middleware = [*_middleware, *_agent["middleware"]]
+        return create_agent(
             sub_model,
             prompt=_agent["prompt"],
             tools=_tools,
-            middleware=_middleware,
+            middleware=_with_tool_call_scheduling(_tools, _middleware),
             checkpointer=False,
         )
-    return agents
+
+    builders = {"general-purpose": build_general_purpose}
+    for _agent in subagents:
+        if "graph" in _agent:
+            builders[_agent["name"]] = lambda graph=_agent["graph"]: graph
+        else:
+            builders[_agent["name"]] = partial(build_subagent, _agent)
+    return _LazySubAgentGraphs(builders)
+
+
+# Provided to every subagent by its default middleware
+_BUILTIN_TOOL_NAMES = {"write_todos", "update_todos", "ls", "read_file", "write_file", "edit_file", "glob", "grep"}
+
+
+def _resolve_subagent_tools(_agent: SubAgent, default_subagent_tools: list[BaseTool]) -> list[BaseTool]:
+    """Resolve tools given by name against the tools passed to the main agent."""
+    tools_by_name = {}
+    for _tool in default_subagent_tools:
+        name = getattr(_tool, "name", None) or getattr(_tool, "__name__", None)
+        if name is not None:
+            tools_by_name[name] = _tool
+    _tools = []
+    for _tool in _agent["tools"]:
+        if not isinstance(_tool, str):
+            _tools.append(_tool)
+        elif _tool in tools_by_name:
+            _tools.append(tools_by_name[_tool])
+        elif _tool not in _BUILTIN_TOOL_NAMES:
+            raise ValueError(f"Subagent {_agent['name']} uses unknown tool {_tool}")
+    return _tools
 
 
 def _get_subagent_description(subagents: list[SubAgent | CustomSubAgent]):
@@ -131,12 +418,98 @@ def create_task_tool(
     subagents: list[SubAgent | CustomSubAgent],
     model,
     is_async: bool = False,
+    filesystem_backend: Optional[FilesystemBackend] = None,
+    summarization: Optional[SummarizationConfig] = None,
+    model_cache: Optional["ModelResponseCache"] = None,
 ):
     agents = _get_agents(
-        default_subagent_tools, subagents, model
+        default_subagent_tools, subagents, model, filesystem_backend, summarization, model_cache
     )
-    other_agents_string = _get_subagent_description(subagents)
+    return _create_task_tool(agents, subagents, is_async)
+
+
+# Keys that belong to one agent's own loop and are never handed to or taken from a subagent
+_EXCLUDED_STATE_KEYS = ("messages", "todos", "jump_to", "response")
+
+
+def _get_subagent_input(parent_state: dict, description: str) -> dict:
+    """Build a subagent's input from the parent state without copying or mutating it.
+
+    Values are handed over by reference. That is safe for `files`: its reducer
+    never mutates the current value, so a subagent's writes land in a new dict.
+    """
+    subagent_state = {k: v for k, v in parent_state.items() if k not in _EXCLUDED_STATE_KEYS}
+    subagent_state["messages"] = [{"role": "user", "content": description}]
+    return subagent_state
+
+
+def _get_state_update(parent_state: dict, result: dict, reducers: Mapping[str, Callable[[Any, Any], Any]]) -> dict:
+    """Collect the keys a subagent run changed, as deltas where the parent merges them.
+
+    `files` is reduced to a per-path delta. Other keys with a reducer only carry
+    the entries the run added or changed (the new items of a list, the changed
+    items of a dict), so that the parent's reducer applies just this run's
+    writes: a sibling task's update to an entry is not reverted by the copy of
+    it this run was handed.
+    """
+    state_update = {}
+    for k, v in result.items():
+        if k in _EXCLUDED_STATE_KEYS:
+            continue
+        if k == "files":
+            parent_files = parent_state.get("files") or {}
+            delta = {path: content for path, content in v.items() if parent_files.get(path) != content}
+            delta.update({path: None for path in parent_files if path not in v})
+            if delta:
+                state_update["files"] = delta
+            continue
+        if k in parent_state and (parent_state[k] is v or parent_state[k] == v):
+            continue
+        if k in reducers and k in parent_state:
+            v = _changed_items(parent_state[k], v)
+            if not v:
+                continue
+        state_update[k] = v
+    return state_update
+
+
+def _changed_items(parent_value: Any, value: Any) -> Any:
+    """The part of `value` that is new relative to `parent_value`, when that can be told apart."""
+    if isinstance(parent_value, dict) and isinstance(value, dict):
+        return {k: v for k, v in value.items() if k not in parent_value or parent_value[k] != v}
+    if isinstance(parent_value, list) and isinstance(value, list) and value[:len(parent_value)] == parent_value:
+        return value[len(parent_value):]
+    return value
 
+
+def _state_reducers(agent: Runnable) -> dict[str, Callable[[Any, Any], Any]]:
+    """The reducers of a subagent graph's state keys, by key (none for plain runnables)."""
+    channels = getattr(agent, "channels", None) or {}
+    return {k: channel.operator for k, channel in channels.items() if callable(getattr(channel, "operator", None))}
+
+
+def _merge_state_updates(state_updates: list[dict], reducers: Mapping[str, Callable[[Any, Any], Any]]) -> dict:
+    """Merge subagent updates in order into one update for the parent.
+
+    Keys with a reducer are combined through it, so e.g. items that several
+    tasks add to the same dict all survive; later tasks win on conflicting
+    paths in `files` and on keys without a reducer.
+    """
+    merged = {}
+    for state_update in state_updates:
+        for k, v in state_update.items():
+            if k == "files":
+                # Deltas, whose `None` deletions must survive until the parent applies them
+                merged["files"] = {**merged.get("files", {}), **v}
+            elif k in merged and k in reducers:
+                merged[k] = reducers[k](merged[k], v)
+            else:
+                merged[k] = v
+    return merged
+
+
+def _create_task_tool(agents: Mapping[str, Runnable], subagents: list[SubAgent | CustomSubAgent], is_async: bool):
+    other_agents_string = _get_subagent_description(subagents)
     if is_async:
         @tool(
             description=TASK_TOOL_DESCRIPTION.format(other_agents=other_agents_string)
@@ -150,15 +523,10 @@ def create_task_tool(
             if subagent_type not in agents:
                 return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
             sub_agent = agents[subagent_type]
-            state["messages"] = [{"role": "user", "content": description}]
-            result = await sub_agent.ainvoke(state)
-            state_update = {}
-            for k, v in result.items():
-                if k not in ["todos", "messages"]:
-                    state_update[k] = v
+            result = await sub_agent.ainvoke(_get_subagent_input(state, description))
             return Command(
                 update={
-                    **state_update,
+                    **_get_state_update(state, result, _state_reducers(sub_agent)),
                     "messages": [
                         ToolMessage(
                             result["messages"][-1].content, tool_call_id=tool_call_id
@@ -179,15 +547,10 @@ def create_task_tool(
             if subagent_type not in agents:
                 return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
             sub_agent = agents[subagent_type]
-            state["messages"] = [{"role": "user", "content": description}]
-            result = sub_agent.invoke(state)
-            state_update = {}
-            for k, v in result.items():
-                if k not in ["todos", "messages"]:
-                    state_update[k] = v
+            result = sub_agent.invoke(_get_subagent_input(state, description))
             return Command(
                 update={
-                    **state_update,
+                    **_get_state_update(state, result, _state_reducers(sub_agent)),
                     "messages": [
                         ToolMessage(
                             result["messages"][-1].content, tool_call_id=tool_call_id
@@ -195,4 +558,96 @@ def create_task_tool(
                     ],
                 }
             )
-    return task
+    return declare_side_effects(task, side_effect_free=False)
+
+
+def _create_parallel_task_tool(
+    agents: Mapping[str, Runnable],
+    subagents: list[SubAgent | CustomSubAgent],
+    is_async: bool,
+    max_concurrency: int,
+):
+    description = PARALLEL_TASK_TOOL_DESCRIPTION.format(
+        other_agents=_get_subagent_description(subagents), max_concurrency=max_concurrency
+    )
+
+    def _validate(tasks: list[SubAgentTask]) -> Optional[str]:
+        if not tasks:
+            return "Error: no tasks provided"
+        for task in tasks:
+            if task["subagent_type"] not in agents:
+                return f"Error: invoked agent of type {task['subagent_type']}, the only allowed types are {[f'`{k}`' for k in agents]}"
+        return None
+
+    def _build_command(tasks: list[SubAgentTask], outcomes: list, tool_call_id: str) -> Command:
+        reports = []
+        state_updates = []
+        reducers = {}
+        for i, (task, outcome) in enumerate(zip(tasks, outcomes), start=1):
+            if isinstance(outcome, Exception):
+                report = f"Error: {outcome}"
+            else:
+                report = outcome[0]
+                state_updates.append(outcome[1])
+                reducers.update(_state_reducers(agents[task["subagent_type"]]))
+            reports.append(f"## Task {i} ({task['subagent_type']})\n{report}")
+        return Command(
+            update={
+                **_merge_state_updates(state_updates, reducers),
+                "messages": [ToolMessage("\n\n".join(reports), tool_call_id=tool_call_id)],
+            }
+        )
+
+    if is_async:
+        @tool(description=description)
+        async def parallel_task(
+            tasks: list[SubAgentTask],
+            state: Annotated[dict, InjectedState],
+            tool_call_id: Annotated[str, InjectedToolCallId],
+        ):
+            if error := _validate(tasks):
+                return error
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def _run(task: SubAgentTask):
+                try:
+                    async with semaphore:
+                        result = await agents[task["subagent_type"]].ainvoke(_get_subagent_input(state, task["description"]))
+                except GraphBubbleUp:
+                    # Interrupts (e.g. human-in-the-loop) must reach the graph; cancellation is not an Exception
+                    raise
+                except Exception as e:
+                    return e
+                return result["messages"][-1].content, _get_state_update(
+                    state, result, _state_reducers(agents[task["subagent_type"]])
+                )
+
+            outcomes = await asyncio.gather(*(_run(task) for task in tasks))
+            return _build_command(tasks, outcomes, tool_call_id)
+    else:
+        @tool(description=description)
+        def parallel_task(
+            tasks: list[SubAgentTask],
+            state: Annotated[dict, InjectedState],
+            tool_call_id: Annotated[str, InjectedToolCallId],
+        ):
+            if error := _validate(tasks):
+                return error
+
+            def _run(task: SubAgentTask):
+                result = agents[task["subagent_type"]].invoke(_get_subagent_input(state, task["description"]))
+                return result["messages"][-1].content, _get_state_update(
+                    state, result, _state_reducers(agents[task["subagent_type"]])
+                )
+
+            outcomes = []
+            with ContextThreadPoolExecutor(max_workers=min(max_concurrency, len(tasks))) as executor:
+                for future in [executor.submit(_run, task) for task in tasks]:
+                    try:
+                        outcomes.append(future.result())
+                    except GraphBubbleUp:
+                        raise
+                    except Exception as e:
+                        outcomes.append(e)
+            return _build_command(tasks, outcomes, tool_call_id)
+    return declare_side_effects(parallel_task, side_effect_free=False)
@@ -1,5 +1,33 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import json
+import threading
+from typing import Any
 
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
 
-def get_default_model():
-    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.5)
+DEFAULT_MODEL_SETTINGS = {"model": "gemini-2.5-flash", "model_provider": "google_genai", "temperature": 0.5}
+
+_models: dict[str, BaseChatModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_chat_model(**settings: Any) -> BaseChatModel:
+    """Return a chat model for `init_chat_model` settings, shared by everyone asking for the same settings.
+
+    Each model instance owns its provider client and connection pool, so reusing
+    instances lets the main agent, its subagents and concurrent runs share
+    connections instead of constructing a client (and handshaking) per agent.
+    Returned models are shared: use `bind` or `with_config` rather than mutating them.
+    """
+    key = json.dumps(settings, sort_keys=True, default=repr)
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                model = _models[key] = init_chat_model(**settings)
+    return model
+
+
+def get_default_model() -> BaseChatModel:
+    return get_chat_model(**DEFAULT_MODEL_SETTINGS)
@@ -212,6 +212,16 @@ Being proactive with task management demonstrates attentiveness and ensures you
 Remember: If you only need to make a few tool calls to complete a task, and it is clear what you need to do, it is better to just do the task directly and NOT call this tool at all.
 """
 
+UPDATE_TODOS_TOOL_DESCRIPTION = """Change items of the todo list written with `write_todos`, by id, without rewriting the whole list.
+Each operation is one of:
+- {"op": "update", "id": "2", "status": "completed"} to change the status (or "content") of a todo
+- {"op": "add", "content": "...", "status": "pending"} to append a new todo; its id is returned
+- {"op": "remove", "id": "3"} to delete a todo that is no longer relevant
+
+Operations are applied in order, so one call can complete a task and start the next:
+[{"op": "update", "id": "1", "status": "completed"}, {"op": "update", "id": "2", "status": "in_progress"}]
+Prefer this tool over `write_todos` for every change after the list is first written."""
+
 TASK_TOOL_DESCRIPTION = """Launch an ephemeral subagent to handle complex, multi-step independent tasks with isolated context windows. 
 
 Available agent types and the tools they have access to:
@@ -221,7 +231,7 @@ Available agent types and the tools they have access to:
 When using the Task tool, you must specify a subagent_type parameter to select which agent type to use.
 
 ## Usage notes:
-1. Launch multiple agents concurrently whenever possible, to maximize performance; to do that, use a single message with multiple tool uses
+1. Launch multiple agents concurrently whenever possible, to maximize performance; to do that, use the `parallel_task` tool (several `task` calls in one message run one after another)
 2. When the agent is done, it will return a single message back to you. The result returned by the agent is not visible to the user. To show the user the result, you should send a text message back to the user with a concise summary of the result.
 3. Each agent invocation is stateless. You will not be able to send additional messages to the agent, nor will the agent be able to communicate with you outside of its final report. Therefore, your prompt should contain a highly detailed task description for the agent to perform autonomously and you should specify exactly what information the agent should return back to you in its final and only message to you.
 4. The agent's outputs should generally be trusted
@@ -323,6 +333,18 @@ Since the user is greeting, use the greeting-responder agent to respond with a f
 assistant: "I'm going to use the Task tool to launch with the greeting-responder agent"
 </example>"""
 
+PARALLEL_TASK_TOOL_DESCRIPTION = """Launch several ephemeral subagents at once and wait for all of them to finish. Each entry in `tasks` has a `description` and a `subagent_type`, exactly like a single call to the `task` tool.
+
+Available agent types:
+- general-purpose: General-purpose agent for researching complex questions, searching for files and content, and executing multi-step tasks. This agent has access to all tools as the main agent.
+{other_agents}
+
+Usage notes:
+1. Use this tool when you have several independent tasks to delegate, e.g. producing N variations of the same deliverable. Up to {max_concurrency} subagents run at the same time; the rest wait for a free slot.
+2. Only batch tasks that do not depend on each other's results. If one task needs another's output, run them with separate calls.
+3. You get back one report per task, in the same order as `tasks`. A failed task is reported as an error without affecting the others.
+4. If two tasks write the same file, the task listed later wins. Give each task its own output files to avoid this."""
+
 LIST_FILES_TOOL_DESCRIPTION = """Lists all files in the local filesystem.
 
 Usage:
@@ -330,6 +352,23 @@ Usage:
 - This is very useful for exploring the file system and finding the right file to read or edit.
 - You should almost ALWAYS use this tool before using the Read or Edit tools."""
 
+GLOB_TOOL_DESCRIPTION = """Finds files in the local filesystem whose path matches a glob pattern.
+
+Usage:
+- `*` matches within one path segment, `**` matches any number of segments, e.g. "/research/**/*.md"
+- A pattern that does not start with "/" matches at any depth, e.g. "*.md" finds every markdown file
+- Returns the matching paths, sorted
+- Prefer this tool over `ls` when you are looking for particular files among many"""
+
+GREP_TOOL_DESCRIPTION = """Searches the contents of files in the local filesystem for a regular expression.
+
+Usage:
+- `pattern` is a Python regular expression, matched against each line
+- `path_glob` limits the search to files whose path matches it (same syntax as the `glob` tool); by default every file is searched
+- Set `ignore_case` to match regardless of case
+- Returns one line per match as `path:line_number: line`, up to `max_matches` matches
+- Use this tool to find which files mention something, and where, instead of reading files one by one; then use `read_file` with `offset` around the reported line numbers"""
+
 READ_FILE_TOOL_DESCRIPTION = """Reads a file from the local filesystem. You can access any file directly by using this tool.
 Assume this tool is able to read all files on the machine. If the User provides a path to a file assume that path is valid. It is okay to read a file that does not exist; an error will be returned.
 
@@ -371,6 +410,8 @@ It is critical that you mark todos as completed as soon as you are done with a s
 For simple objectives that only require a few steps, it is better to just complete the objective directly and NOT use this tool.
 Writing todos takes time and tokens, use it when it is helpful for managing complex many-step problems! But not for simple few-step requests.
 
+Every todo has an id, listed when the list is written. To mark progress, add or remove items, use `update_todos` with those ids instead of rewriting the whole list with `write_todos`.
+
 ## Important To-Do List Usage Notes to Remember
 - The `write_todos` tool should never be called multiple times in parallel.
 - Don't be afraid to revise the To-Do list as you go. New information may reveal new tasks that need to be done, or old tasks that are irrelevant."""
@@ -401,16 +442,43 @@ When NOT to use the task tool:
 ## Important Task Tool Usage Notes to Remember
 - Whenever possible, parallelize the work that you do. This is true for both tool_calls, and for tasks. Whenever you have independent steps to complete - make tool_calls, or kick off tasks (subagents) in parallel to accomplish them faster. This saves time for the user, which is incredibly important.
 - Remember to use the `task` tool to silo independent tasks within a multi-part objective.
+- When you have several independent tasks to delegate at once, use the `parallel_task` tool to launch them as a single batch.
 - You should use the `task` tool whenever you have a complex task that will take multiple steps, and is independent from other tasks that the agent needs to complete. These agents are highly competent and efficient."""
 
-FILESYSTEM_SYSTEM_PROMPT = """## Filesystem Tools `ls`, `read_file`, `write_file`, `edit_file`
+FILESYSTEM_SYSTEM_PROMPT = """## Filesystem Tools `ls`, `glob`, `grep`, `read_file`, `write_file`, `edit_file`
 
 You have access to a local, private filesystem which you can interact with using these tools.
 - ls: list all files in the local filesystem
+- glob: find files whose path matches a pattern
+- grep: search file contents for a regular expression, returning matching lines with line numbers
 - read_file: read a file from the local filesystem
 - write_file: write to a file in the local filesystem
 - edit_file: edit a file in the local filesystem"""
 
 BASE_AGENT_PROMPT = """
 In order to complete the objective that the user asks of you, you have access to a number of standard tools.
-"""
\ No newline at end of file
+"""
+SPILLED_TOOL_RESULT_MESSAGE = """This result was too large to keep in context ({num_chars} characters, {num_lines} lines), so it was saved to the file `{file_path}`. Use `read_file` with `offset` and `limit` to read the parts you need.
+
+Preview:
+{preview}"""
+
+ROLLING_SUMMARY_PROMPT = """You are maintaining a running summary of a long conversation between a user and an AI agent, so that older messages can be dropped from the agent's context.
+
+Update the existing summary with the new messages below. Keep everything the agent still needs to reach its goal: the user's request and constraints, decisions made, work already completed (so it is not repeated), files written, open questions and next steps. Drop pleasantries and details that no longer matter. Respond ONLY with the updated summary.
+
+<existing_summary>
+{summary}
+</existing_summary>
+
+<new_messages>
+{messages}
+</new_messages>"""
+
+TOOL_RESULT_SUMMARY_PROMPT = """The agent already read the following result of the `{tool_name}` tool. It will be replaced by your summary to save space in the agent's context.
+
+Summarize it, keeping every fact, figure, name and identifier the agent may still need, and say which parts were left out. Respond ONLY with the summary.
+
+<tool_result>
+{content}
+</tool_result>"""
@@ -0,0 +1,368 @@
+"""Indexes for searching the virtual filesystem by path and by content.
+
+`FileSearchIndex` backs the `glob` and `grep` tools. It keeps a trie of path
+segments, so a glob only walks the directories its pattern can match, and a
+trigram index over file contents, so a grep only runs its regex over the files
+that contain every literal run of three or more characters in the pattern.
+Both are brought up to date incrementally on each search, by re-indexing only
+the paths whose value in `files` changed since the last one.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from typing import Callable, Hashable, Iterator, Optional
+
+from deepagents.backends import FilesystemBackend
+
+# Characters with a meaning in a regex; anything else (or anything escaped) is a literal
+_REGEX_META = set(".^$*+?{}[]()|\\")
+_QUANTIFIERS = set("*+?{")
+# Escapes followed by a fixed number of hex digits
+_ESCAPE_DIGITS = {"x": 2, "u": 4, "U": 8}
+
+# "İ" is the only character whose lowercase is longer than one character; `re` matches it as "i"
+_BEFORE_LOWER = {0x130: "i"}
+# The other characters that `re.IGNORECASE` matches to an ASCII letter but do not lowercase to it,
+# and the final sigma, which `str.lower` picks from context so that a substring may fold differently
+_AFTER_LOWER = {0x131: "i", 0x17F: "s", 0x3C2: "σ"}
+
+
+def case_fold(text: str) -> str:
+    """Map `text` to lowercase, one character per character.
+
+    Unlike `str.lower` this never changes the length and does not depend on
+    context, and it also folds the characters that `re.IGNORECASE` matches to
+    an ASCII letter (such as "ſ" and "s"). So the trigrams of a folded ASCII
+    pattern are always found in the folded text it matches, with or without
+    `re.IGNORECASE`, and so are those of any pattern matched case-sensitively.
+    """
+    if text.isascii():
+        return text.lower()
+    return text.translate(_BEFORE_LOWER).lower().translate(_AFTER_LOWER)
+
+
+def _trigrams(text: str) -> set[str]:
+    # Case-folded, so one index serves both case-sensitive and case-insensitive searches
+    text = case_fold(text)
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def required_trigrams(pattern: str, flags: int = 0) -> set[str]:
+    """Return trigrams that every match of the regex `pattern` must contain.
+
+    Only literal runs outside of groups and character classes are considered,
+    which is conservative: an empty set means any file may match. A pattern
+    with a top-level alternation requires nothing, and neither do non-ASCII
+    characters when matching ignores case.
+    """
+    flags = re.compile(pattern, flags).flags
+    if flags & re.VERBOSE:
+        # Whitespace in the pattern is not literal
+        return set()
+    # Beyond ASCII, `re.IGNORECASE` has equivalences (e.g. "σ" and "ς") that `case_fold` does not merge
+    ignore_case = bool(flags & re.IGNORECASE)
+    runs: list[str] = []
+    run: list[str] = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == "\\":
+            i += 1
+            escaped = pattern[i:i + 1]
+            if escaped and not escaped.isalnum():
+                literal = escaped
+            # \d, \n, \x41, back-references and the like are not the character itself:
+            # end the run and skip the whole escape, so its digits are not taken as literals
+            elif escaped in _ESCAPE_DIGITS:
+                i += _ESCAPE_DIGITS[escaped]
+            elif escaped == "N":
+                i = pattern.find("}", i) if "}" in pattern[i:] else len(pattern)
+            elif escaped.isdigit():
+                # Octal escapes have up to three digits, back-references up to two
+                last = i + 2
+                while i < last and pattern[i + 1:i + 2].isdigit():
+                    i += 1
+        elif char == "[":
+            # Skip the class, including a leading "]" (or "^]") that is part of it
+            i += 2 if pattern[i + 1:i + 2] == "^" else 1
+            if pattern[i:i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif char == "{":
+            i = pattern.find("}", i) if "}" in pattern[i:] else len(pattern)
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        elif char == "|" and depth == 0:
+            return set()
+        elif char not in _REGEX_META:
+            literal = char
+        i += 1
+        if ignore_case and literal is not None and not literal.isascii():
+            literal = None
+        # A quantified character is optional or repeated, so it cannot extend a run either
+        if literal is None or depth > 0 or (i < len(pattern) and pattern[i] in _QUANTIFIERS):
+            runs.append("".join(run))
+            run = []
+        else:
+            run.append(literal)
+    runs.append("".join(run))
+    return set().union(*(_trigrams(r) for r in runs if len(r) >= 3))
+
+
+class _TrieNode:
+    __slots__ = ("children", "path")
+
+    def __init__(self) -> None:
+        self.children: dict[str, "_TrieNode"] = {}
+        # The full path when a file ends at this node
+        self.path: Optional[str] = None
+
+
+class PathTrie:
+    """Paths split on "/" into a tree of segments, for matching glob patterns."""
+
+    def __init__(self) -> None:
+        self.root = _TrieNode()
+
+    def add(self, path: str) -> None:
+        node = self.root
+        for segment in path.split("/"):
+            node = node.children.setdefault(segment, _TrieNode())
+        node.path = path
+
+    def remove(self, path: str) -> None:
+        nodes = [self.root]
+        segments = path.split("/")
+        for segment in segments:
+            node = nodes[-1].children.get(segment)
+            if node is None:
+                return
+            nodes.append(node)
+        nodes[-1].path = None
+        # Prune the branches left empty
+        for segment, parent, node in zip(reversed(segments), reversed(nodes[:-1]), reversed(nodes)):
+            if node.children or node.path is not None:
+                break
+            del parent.children[segment]
+
+    def glob(self, pattern: str) -> list[str]:
+        """Return the paths matching `pattern`, sorted.
+
+        Each segment is matched with `fnmatch` (`*`, `?`, `[abc]`), and a `**`
+        segment matches any number of segments. A pattern that does not start
+        with "/" may match at any depth, like `**/<pattern>`.
+        """
+        if not pattern.startswith("/") and not pattern.startswith("**"):
+            pattern = "**/" + pattern
+        # "**" can reach the same path in more than one way
+        return sorted(set(self._match(self.root, pattern.split("/"))))
+
+    def _match(self, node: _TrieNode, segments: list[str]) -> Iterator[str]:
+        if not segments:
+            if node.path is not None:
+                yield node.path
+            return
+        segment, rest = segments[0], segments[1:]
+        if segment == "**":
+            # Match zero segments, or one and keep "**" for the rest
+            yield from self._match(node, rest)
+            for name in node.children:
+                yield from self._match(node.children[name], segments)
+        elif any(c in segment for c in "*?["):
+            for name in node.children:
+                if fnmatchcase(name, segment):
+                    yield from self._match(node.children[name], rest)
+        else:
+            child = node.children.get(segment)
+            if child is not None:
+                yield from self._match(child, rest)
+
+
+class _IndexedFiles:
+    """Path trie and trigram postings for one version of `files`, updated in place."""
+
+    def __init__(self, trigrams_of: Callable[[str], tuple[frozenset[str], int]]) -> None:
+        self.trigrams_of = trigrams_of
+        self.paths = PathTrie()
+        self.values: dict[str, str] = {}
+        self.postings: dict[str, set[str]] = {}
+        self.sizes: dict[str, int] = {}
+        # Total size of the indexed files, see `FileSearchIndex._trigrams_of`
+        self.chars = 0
+
+    def shared_values(self, files: dict[str, str]) -> int:
+        """How many of `files` are already indexed here, i.e. how cheap `update` would be."""
+        values = self.values
+        return sum(1 for path, value in files.items() if values.get(path) is value)
+
+    def update(self, files: dict[str, str]) -> None:
+        for path in [p for p in self.values if p not in files]:
+            self._remove(path)
+        for path, value in files.items():
+            indexed = self.values.get(path)
+            # Unchanged values are usually the very same object, so `is` settles most paths
+            if indexed is value or indexed == value:
+                continue
+            if indexed is not None:
+                self._remove(path)
+            self._add(path, value)
+
+    def candidates(self, regex: str, path_glob: str, flags: int) -> list[str]:
+        paths = self.paths.glob(path_glob)
+        required = required_trigrams(regex, flags)
+        if not required:
+            return paths
+        postings = sorted((self.postings.get(t, set()) for t in required), key=len)
+        if not postings[0]:
+            return []
+        matching = set.intersection(*postings)
+        return [path for path in paths if path in matching]
+
+    def _add(self, path: str, value: str) -> None:
+        trigrams, size = self.trigrams_of(value)
+        self.values[path] = value
+        self.sizes[path] = size
+        self.chars += size
+        self.paths.add(path)
+        for trigram in trigrams:
+            self.postings.setdefault(trigram, set()).add(path)
+
+    def _remove(self, path: str) -> None:
+        value = self.values.pop(path)
+        self.chars -= self.sizes.pop(path)
+        self.paths.remove(path)
+        trigrams, _ = self.trigrams_of(value)
+        for trigram in trigrams:
+            paths = self.postings.get(trigram)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self.postings[trigram]
+
+
+class FileSearchIndex:
+    """Path and content indexes over the `files` of agents, for `glob` and `grep`.
+
+    Every search passes the caller's current files. The index used for it is
+    brought up to date with those files and queried while no other search can
+    touch it. Concurrent runs (other threads, parallel subagents) see different
+    files, so up to `max_indexes` indexes are kept and each search takes the
+    free one that already holds most of its files; that way runs do not keep
+    re-indexing each other's files. The trigrams of each file value are cached
+    and shared by all of them.
+
+    Indexes and cached trigrams keep the values they were built from alive, as
+    the line indexes of `FilesystemBackend` do, and the default tools share one
+    `FileSearchIndex` across every run in the process. So both are bounded by
+    size, counted as the characters of each file plus those of its distinct
+    trigrams: once a search is done, idle indexes are dropped, least recently
+    used first, until all of them fit in `max_indexed_chars`, and cached
+    trigrams are evicted the same way beyond `max_cached_chars` (or
+    `max_cached_files` files). The most recently used of each is always kept,
+    even when it alone is over budget, so that repeated searches of a large
+    set of files are not indexed from scratch every time. Call `clear` to drop
+    everything that is not in use.
+    """
+
+    def __init__(
+        self,
+        backend: FilesystemBackend,
+        max_indexes: int = 8,
+        max_cached_files: int = 4096,
+        max_indexed_chars: int = 16 * 2**20,
+        max_cached_chars: int = 16 * 2**20,
+    ) -> None:
+        self.backend = backend
+        self.max_indexes = max_indexes
+        self.max_cached_files = max_cached_files
+        self.max_indexed_chars = max_indexed_chars
+        self.max_cached_chars = max_cached_chars
+        self._indexes: list[_IndexedFiles] = []
+        self._busy: set[int] = set()
+        self._available = threading.Condition()
+        self._file_trigrams: OrderedDict[Hashable, tuple[str, frozenset[str], int]] = OrderedDict()
+        self._cached_chars = 0
+        self._trigrams_lock = threading.Lock()
+
+    def glob(self, files: dict[str, str], pattern: str) -> list[str]:
+        """Paths of `files` matching the glob `pattern`, sorted."""
+        with self._index_for(files) as index:
+            return [path for path in index.paths.glob(pattern) if path in files]
+
+    def candidates(self, files: dict[str, str], regex: str, path_glob: str = "**", flags: int = 0) -> list[str]:
+        """Paths of `files` matching `path_glob` that may contain a match for `regex`, sorted."""
+        with self._index_for(files) as index:
+            return [path for path in index.candidates(regex, path_glob, flags) if path in files]
+
+    @contextmanager
+    def _index_for(self, files: dict[str, str]) -> Iterator[_IndexedFiles]:
+        with self._available:
+            while True:
+                free = [index for index in self._indexes if id(index) not in self._busy]
+                best = max(free, key=lambda index: index.shared_values(files), default=None)
+                if best is not None and (best.shared_values(files) or len(self._indexes) >= self.max_indexes):
+                    break
+                if len(self._indexes) < self.max_indexes:
+                    best = _IndexedFiles(self._trigrams_of)
+                    self._indexes.append(best)
+                    break
+                self._available.wait()
+            self._busy.add(id(best))
+        try:
+            best.update(files)
+            yield best
+        finally:
+            with self._available:
+                self._busy.discard(id(best))
+                # Most recently used last, so that idle indexes are dropped oldest first
+                self._indexes.remove(best)
+                self._indexes.append(best)
+                chars = sum(index.chars for index in self._indexes)
+                for index in self._indexes[:-1]:
+                    if chars <= self.max_indexed_chars:
+                        break
+                    if id(index) not in self._busy:
+                        self._indexes.remove(index)
+                        chars -= index.chars
+                self._available.notify()
+
+    def clear(self) -> None:
+        """Drop the cached trigrams and every index not in use by a search."""
+        with self._available:
+            self._indexes = [index for index in self._indexes if id(index) in self._busy]
+        with self._trigrams_lock:
+            self._file_trigrams.clear()
+            self._cached_chars = 0
+
+    def _trigrams_of(self, value: str) -> tuple[frozenset[str], int]:
+        """Return the trigrams of a value in `files`, and its size for the budgets."""
+        # Same identity keying as `FilesystemBackend.line_index`: values are immutable
+        key = id(value)
+        with self._trigrams_lock:
+            cached = self._file_trigrams.get(key)
+            if cached is not None and cached[0] is value:
+                self._file_trigrams.move_to_end(key)
+                return cached[1], cached[2]
+        content = self.backend.load(value)
+        trigrams = frozenset(_trigrams(content))
+        size = len(content) + 3 * len(trigrams)
+        with self._trigrams_lock:
+            previous = self._file_trigrams.pop(key, None)
+            if previous is not None:
+                self._cached_chars -= previous[2]
+            self._file_trigrams[key] = (value, trigrams, size)
+            self._cached_chars += size
+            while len(self._file_trigrams) > 1 and (
+                len(self._file_trigrams) > self.max_cached_files or self._cached_chars > self.max_cached_chars
+            ):
+                _, (_, _, evicted) = self._file_trigrams.popitem(last=False)
+                self._cached_chars -= evicted
+        return trigrams, size
@@ -1,5 +1,5 @@
 from langchain.agents.middleware import AgentState
-from typing import NotRequired, Annotated
+from typing import NotRequired, Annotated, Optional, Union
 from typing import Literal
 from typing_extensions import TypedDict
 
@@ -9,24 +9,85 @@ class Todo(TypedDict):
 
     content: str
     status: Literal["pending", "in_progress", "completed"]
+    # Stable id used by `update_todos`; assigned by `write_todos` when missing
+    id: NotRequired[str]
 
 
-def file_reducer(l, r):
-    if l is None:
+class TodoOperation(TypedDict):
+    """One change to the todo list, applied by `update_todos`."""
+
+    op: Literal["add", "update", "remove"]
+    # Required for "update" and "remove"; a new id is assigned when adding without one
+    id: NotRequired[str]
+    content: NotRequired[str]
+    status: NotRequired[Literal["pending", "in_progress", "completed"]]
+
+
+class TodoOperations(TypedDict):
+    """A `todos` update that changes some items instead of replacing the list."""
+
+    operations: list[TodoOperation]
+
+
+def todos_reducer(l: Optional[list[Todo]], r: Union[list[Todo], TodoOperations, None]) -> list[Todo]:
+    """Apply a `todos` update: a list replaces the todos, operations change them in order.
+
+    Operations on ids that do not exist are skipped; `update_todos` checks ids
+    before sending them. The current list is never mutated in place.
+    """
+    if r is None:
+        return l or []
+    if isinstance(r, list):
         return r
-    elif r is None:
+    todos = list(l or [])
+    for operation in r["operations"]:
+        if operation["op"] == "add":
+            todos.append({
+                "id": operation["id"],
+                "content": operation.get("content", ""),
+                "status": operation.get("status", "pending"),
+            })
+            continue
+        index = next((i for i, todo in enumerate(todos) if todo.get("id") == operation.get("id")), None)
+        if index is None:
+            continue
+        if operation["op"] == "remove":
+            del todos[index]
+        else:
+            changes = {k: operation[k] for k in ("content", "status") if k in operation}
+            todos[index] = {**todos[index], **changes}
+    return todos
+
+
+def file_reducer(l, r):
+    """Apply a `files` delta to the current files.
+
+    Each key in the update is a path to upsert; a value of `None` deletes that
+    path. Only the paths in the update are visited. The current mapping is never
+    mutated in place because LangGraph shares channel values across checkpoints,
+    so the result is a shallow copy (file contents themselves are not copied).
+    """
+    if r is None:
         return l
-    else:
-        return {**l, **r}
+    if l is None:
+        return {k: v for k, v in r.items() if v is not None}
+    merged = dict(l)
+    for path, content in r.items():
+        if content is None:
+            merged.pop(path, None)
+        else:
+            merged[path] = content
+    return merged
 
 
 class DeepAgentState(AgentState):
-    todos: NotRequired[list[Todo]]
+    todos: NotRequired[Annotated[list[Todo], todos_reducer]]
     files: Annotated[NotRequired[dict[str, str]], file_reducer]
 
 
 class PlanningState(AgentState):
-    todos: NotRequired[list[Todo]]
+    # Annotated inside NotRequired, so the channel starts as a list and every update goes through the reducer
+    todos: NotRequired[Annotated[list[Todo], todos_reducer]]
 
 
 class FilesystemState(AgentState):
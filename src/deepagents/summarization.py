@@ -0,0 +1,269 @@
+"""Conversation summarization policy for deep agents and their subagents."""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Annotated, Any, NotRequired, Optional
+
+from langchain.agents.middleware import AgentState, SummarizationMiddleware
+from langchain.agents.middleware.types import PrivateStateAttr
+from langchain_core.language_models import LanguageModelLike
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    MessageLikeRepresentation,
+    RemoveMessage,
+    ToolMessage,
+    get_buffer_string,
+)
+from langchain_core.messages.utils import convert_to_messages, count_tokens_approximately
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from deepagents.model import get_chat_model
+from deepagents.prompts import ROLLING_SUMMARY_PROMPT, TOOL_RESULT_SUMMARY_PROMPT
+from deepagents.types import SummarizationConfig
+
+DEFAULT_MAX_TOKENS_BEFORE_SUMMARY = 120000
+DEFAULT_MESSAGES_TO_KEEP = 20
+# Id of the message carrying the running summary, always first in the history
+RUNNING_SUMMARY_ID = "running-summary"
+
+
+class CachedTokenCounter:
+    """Approximate token counter that remembers the count of each message.
+
+    Summarization counts the whole history before every model call, although
+    only the newest messages are new. Counts are estimated locally from
+    character lengths (no tokenizer or API call) and cached by message id, so
+    each turn only pays for messages it has not seen before.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self._counts: OrderedDict[str, tuple[BaseMessage, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, messages: Iterable[MessageLikeRepresentation]) -> int:
+        return sum(self._count(message) for message in convert_to_messages(messages))
+
+    def _count(self, message: BaseMessage) -> int:
+        if message.id is None:
+            return count_tokens_approximately([message])
+        with self._lock:
+            cached = self._counts.get(message.id)
+            # A message replaced under the same id is a different object and is recounted
+            if cached is not None and cached[0] is message:
+                self._counts.move_to_end(message.id)
+                return cached[1]
+        count = count_tokens_approximately([message])
+        with self._lock:
+            self._counts[message.id] = (message, count)
+            self._counts.move_to_end(message.id)
+            if len(self._counts) > self.maxsize:
+                self._counts.popitem(last=False)
+        return count
+
+
+class RollingSummaryState(AgentState):
+    running_summary: NotRequired[Annotated[str, PrivateStateAttr]]
+
+
+class RollingSummarizationMiddleware(SummarizationMiddleware):
+    """Summarization that keeps a running summary and updates it in small steps.
+
+    The stock middleware replaces everything but the last `messages_to_keep`
+    messages with one summary, in a single large model call. Instead, once the
+    history passes `max_tokens_before_summary`, this evicts only the oldest
+    messages needed to get back under `target_ratio` of the threshold and folds
+    them into the running summary, at most `max_tokens_per_summary` tokens of
+    messages per call.
+
+    Tool results larger than `max_tool_message_tokens` are also summarized one
+    by one, in place, once the model has responded to them, so a single large
+    result (e.g. a full document) does not stay in context until eviction.
+    """
+
+    state_schema = RollingSummaryState
+
+    def __init__(
+        self,
+        model,
+        max_tokens_before_summary: Optional[int] = DEFAULT_MAX_TOKENS_BEFORE_SUMMARY,
+        messages_to_keep: int = DEFAULT_MESSAGES_TO_KEEP,
+        token_counter=count_tokens_approximately,
+        max_tokens_per_summary: int = 4000,
+        max_tool_message_tokens: Optional[int] = 2000,
+        target_ratio: float = 0.7,
+    ) -> None:
+        super().__init__(
+            model=model,
+            max_tokens_before_summary=max_tokens_before_summary,
+            messages_to_keep=messages_to_keep,
+            token_counter=token_counter,
+        )
+        self.max_tokens_per_summary = max_tokens_per_summary
+        self.max_tool_message_tokens = max_tool_message_tokens
+        self.target_ratio = target_ratio
+
+    def before_model(self, state: RollingSummaryState) -> dict[str, Any] | None:  # type: ignore[override]
+        messages = state["messages"]
+        self._ensure_message_ids(messages)
+
+        summarized_tool_messages = self._summarize_tool_messages(messages)
+        if summarized_tool_messages:
+            messages = [summarized_tool_messages.get(m.id, m) for m in messages]
+
+        evicted, preserved = self._select_evicted_messages(messages)
+        summary = None
+        if evicted:
+            summary = self._fold_into_summary(state.get("running_summary", ""), evicted)
+        if summary is None:
+            # Replacing a message under its id keeps its place in the history
+            return {"messages": list(summarized_tool_messages.values())} if summarized_tool_messages else None
+        return {
+            "running_summary": summary,
+            "messages": [
+                RemoveMessage(id=REMOVE_ALL_MESSAGES),
+                *self._build_new_messages(summary),
+                *preserved,
+            ],
+        }
+
+    def _build_new_messages(self, summary: str) -> list[HumanMessage]:
+        return [
+            HumanMessage(
+                content=f"Here is a summary of the conversation to date:\n\n{summary}",
+                id=RUNNING_SUMMARY_ID,
+            )
+        ]
+
+    def _summarize_tool_messages(self, messages: list[AnyMessage]) -> dict[str, ToolMessage]:
+        """Summarize large tool results the model has already responded to, by message id."""
+        if self.max_tool_message_tokens is None:
+            return {}
+        last_ai_index = next(
+            (i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], AIMessage)), -1
+        )
+        summarized = {}
+        for message in messages[:last_ai_index]:
+            if not isinstance(message, ToolMessage):
+                continue
+            if self.token_counter([message]) <= self.max_tool_message_tokens:
+                continue
+            prompt = TOOL_RESULT_SUMMARY_PROMPT.format(
+                tool_name=message.name or "unknown",
+                content=self._truncate(message.text),
+            )
+            try:
+                summary = self.model.invoke(prompt).text.strip()
+            except Exception:  # noqa: BLE001
+                # Keep the full result rather than lose it
+                continue
+            summarized[message.id] = message.model_copy(
+                update={"content": f"[Summarized tool result]\n{summary}"}
+            )
+        return summarized
+
+    def _select_evicted_messages(
+        self, messages: list[AnyMessage]
+    ) -> tuple[list[AnyMessage], list[AnyMessage]]:
+        """Pick the oldest messages to fold into the summary, and the messages to keep."""
+        if self.max_tokens_before_summary is None:
+            return [], messages
+        tokens = [self.token_counter([m]) for m in messages]
+        remaining = sum(tokens)
+        if remaining < self.max_tokens_before_summary:
+            return [], messages
+
+        # The previous summary message is rebuilt, never folded into itself
+        start = 1 if messages and messages[0].id == RUNNING_SUMMARY_ID else 0
+        max_cutoff = len(messages) - self.messages_to_keep
+        target = self.max_tokens_before_summary * self.target_ratio
+        cutoff = start
+        while cutoff < max_cutoff and remaining > target:
+            remaining -= tokens[cutoff]
+            cutoff += 1
+
+        # Never separate a tool call from its result: evict a little more if possible, else less
+        safe_cutoff = next(
+            (i for i in range(cutoff, max_cutoff + 1) if self._is_safe_cutoff_point(messages, i)),
+            None,
+        )
+        if safe_cutoff is None:
+            safe_cutoff = next(
+                (i for i in range(cutoff - 1, start, -1) if self._is_safe_cutoff_point(messages, i)),
+                start,
+            )
+        if safe_cutoff <= start:
+            return [], messages
+        return messages[start:safe_cutoff], messages[safe_cutoff:]
+
+    def _fold_into_summary(self, summary: str, messages: list[AnyMessage]) -> Optional[str]:
+        """Fold messages into the summary in bounded batches; None if a call failed."""
+        batch: list[AnyMessage] = []
+        batch_tokens = 0
+        batches = []
+        for message in messages:
+            message_tokens = self.token_counter([message])
+            if batch and batch_tokens + message_tokens > self.max_tokens_per_summary:
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(message)
+            batch_tokens += message_tokens
+        if batch:
+            batches.append(batch)
+
+        for batch in batches:
+            prompt = ROLLING_SUMMARY_PROMPT.format(
+                summary=summary or "(empty)",
+                messages="\n\n".join(self._truncate(get_buffer_string([m])) for m in batch),
+            )
+            try:
+                summary = self.model.invoke(prompt).text.strip()
+            except Exception:  # noqa: BLE001
+                # Keep the history as is and try again on the next turn
+                return None
+        return summary
+
+    def _truncate(self, text: str) -> str:
+        # Roughly `max_tokens_per_summary` tokens, at the approximate counter's 4 characters per token
+        limit = self.max_tokens_per_summary * 4
+        if len(text) <= limit:
+            return text
+        return text[:limit] + f"\n... [{len(text) - limit} more characters]"
+
+
+def create_summarization_middleware(
+    model: LanguageModelLike,
+    config: Optional[SummarizationConfig] = None,
+) -> SummarizationMiddleware:
+    """Build the summarization middleware for an agent from its config.
+
+    Args:
+        model: The agent's model, used for summaries unless the config names another one.
+        config: Optional SummarizationConfig; anything left out uses the defaults.
+    """
+    config = config or {}
+    summary_model = config.get("model", model)
+    if isinstance(summary_model, dict):
+        summary_model = get_chat_model(**summary_model)
+    elif isinstance(summary_model, str):
+        summary_model = get_chat_model(model=summary_model)
+    max_tokens_before_summary = config.get("max_tokens_before_summary", DEFAULT_MAX_TOKENS_BEFORE_SUMMARY)
+    messages_to_keep = config.get("messages_to_keep", DEFAULT_MESSAGES_TO_KEEP)
+    if config.get("incremental", False):
+        return RollingSummarizationMiddleware(
+            model=summary_model,
+            max_tokens_before_summary=max_tokens_before_summary,
+            messages_to_keep=messages_to_keep,
+            token_counter=CachedTokenCounter(),
+            max_tool_message_tokens=config.get("max_tool_message_tokens", 2000),
+        )
+    return SummarizationMiddleware(
+        model=summary_model,
+        max_tokens_before_summary=max_tokens_before_summary,
+        messages_to_keep=messages_to_keep,
+        token_counter=CachedTokenCounter(),
+    )
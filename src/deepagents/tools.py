@@ -1,148 +1,253 @@
-from langchain_core.tools import tool, InjectedToolCallId
+from langchain_core.tools import BaseTool, tool, InjectedToolCallId
 from langchain_core.messages import ToolMessage
 from langgraph.types import Command
 from langchain.tools.tool_node import InjectedState
-from typing import Annotated, Union
-from deepagents.state import Todo, FilesystemState
+from typing import Annotated, Optional, Union
+import re
+from deepagents.backends import FilesystemBackend, InMemoryBackend
+from deepagents.search import FileSearchIndex
+from deepagents.state import Todo, TodoOperation, FilesystemState, PlanningState
 from deepagents.prompts import (
     WRITE_TODOS_TOOL_DESCRIPTION,
+    UPDATE_TODOS_TOOL_DESCRIPTION,
     LIST_FILES_TOOL_DESCRIPTION,
+    GLOB_TOOL_DESCRIPTION,
+    GREP_TOOL_DESCRIPTION,
     READ_FILE_TOOL_DESCRIPTION,
     WRITE_FILE_TOOL_DESCRIPTION,
     EDIT_FILE_TOOL_DESCRIPTION,
 )
 
 
+def declare_side_effects(base_tool: BaseTool, side_effect_free: bool) -> BaseTool:
+    """Record in the tool's metadata whether calling it changes agent state.
+
+    Tools declared with side effects are run one at a time when the model calls
+    several in the same turn; see `ToolCallSchedulingMiddleware`.
+    """
+    base_tool.metadata = {**(base_tool.metadata or {}), "side_effect_free": side_effect_free}
+    return base_tool
+
+
+def _next_todo_id(ids: set[str]) -> str:
+    numbers = [int(i) for i in ids if i.isdigit()]
+    return str(max(numbers, default=0) + 1)
+
+
 @tool(description=WRITE_TODOS_TOOL_DESCRIPTION)
 def write_todos(
     todos: list[Todo], tool_call_id: Annotated[str, InjectedToolCallId]
 ) -> Command:
+    ids: set[str] = set()
+    with_ids = []
+    for todo in todos:
+        todo_id = todo.get("id")
+        if not todo_id or todo_id in ids:
+            todo_id = _next_todo_id(ids)
+        ids.add(todo_id)
+        with_ids.append({**todo, "id": todo_id})
+    # The model already has the list it wrote; only tell it the ids to update items by
+    listed = ", ".join(f"{todo['id']}: {todo['content'][:40]}" for todo in with_ids)
     return Command(
         update={
-            "todos": todos,
+            "todos": with_ids,
             "messages": [
-                ToolMessage(f"Updated todo list to {todos}", tool_call_id=tool_call_id)
+                ToolMessage(f"Updated todo list ({len(with_ids)} todos). Ids: {listed}", tool_call_id=tool_call_id)
             ],
         }
     )
 
 
-@tool(description=LIST_FILES_TOOL_DESCRIPTION)
-def ls(state: Annotated[FilesystemState, InjectedState]) -> list[str]:
-    """List all files"""
-    return list(state.get("files", {}).keys())
-
-
-@tool(description=READ_FILE_TOOL_DESCRIPTION)
-def read_file(
-    file_path: str,
-    state: Annotated[FilesystemState, InjectedState],
-    offset: int = 0,
-    limit: int = 2000,
-) -> str:
-    mock_filesystem = state.get("files", {})
-    if file_path not in mock_filesystem:
-        return f"Error: File '{file_path}' not found"
-
-    # Get file content
-    content = mock_filesystem[file_path]
-
-    # Handle empty file
-    if not content or content.strip() == "":
-        return "System reminder: File exists but has empty contents"
-
-    # Split content into lines
-    lines = content.splitlines()
-
-    # Apply line offset and limit
-    start_idx = offset
-    end_idx = min(start_idx + limit, len(lines))
-
-    # Handle case where offset is beyond file length
-    if start_idx >= len(lines):
-        return f"Error: Line offset {offset} exceeds file length ({len(lines)} lines)"
-
-    # Format output with line numbers (cat -n format)
-    result_lines = []
-    for i in range(start_idx, end_idx):
-        line_content = lines[i]
-
-        # Truncate lines longer than 2000 characters
-        if len(line_content) > 2000:
-            line_content = line_content[:2000]
-
-        # Line numbers start at 1, so add 1 to the index
-        line_number = i + 1
-        result_lines.append(f"{line_number:6d}\t{line_content}")
-
-    return "\n".join(result_lines)
-
-
-@tool(description=WRITE_FILE_TOOL_DESCRIPTION)
-def write_file(
-    file_path: str,
-    content: str,
-    state: Annotated[FilesystemState, InjectedState],
+@tool(description=UPDATE_TODOS_TOOL_DESCRIPTION)
+def update_todos(
+    operations: list[TodoOperation],
+    state: Annotated[PlanningState, InjectedState],
     tool_call_id: Annotated[str, InjectedToolCallId],
-) -> Command:
-    files = state.get("files", {})
-    files[file_path] = content
+) -> Union[Command, str]:
+    ids = {todo["id"] for todo in state.get("todos") or [] if todo.get("id")}
+    resolved = []
+    summary = []
+    for operation in operations:
+        op = operation["op"]
+        if op == "add":
+            todo_id = operation.get("id")
+            if not todo_id or todo_id in ids:
+                todo_id = _next_todo_id(ids)
+            ids.add(todo_id)
+            resolved.append({**operation, "id": todo_id})
+            summary.append(f"added {todo_id}")
+            continue
+        todo_id = operation.get("id")
+        if todo_id not in ids:
+            # Nothing is applied, so the model can fix the call and send it again
+            return f"Error: No todo with id '{todo_id}'. Existing ids: {', '.join(sorted(ids)) or 'none'}"
+        if op == "remove":
+            ids.discard(todo_id)
+            summary.append(f"removed {todo_id}")
+        else:
+            summary.append(f"{todo_id} -> {operation['status']}" if "status" in operation else f"updated {todo_id}")
+        resolved.append(operation)
     return Command(
         update={
-            "files": files,
-            "messages": [
-                ToolMessage(f"Updated file {file_path}", tool_call_id=tool_call_id)
-            ],
+            "todos": {"operations": resolved},
+            "messages": [ToolMessage(f"Todos: {', '.join(summary)}", tool_call_id=tool_call_id)],
         }
     )
 
 
-@tool(description=EDIT_FILE_TOOL_DESCRIPTION)
-def edit_file(
-    file_path: str,
-    old_string: str,
-    new_string: str,
-    state: Annotated[FilesystemState, InjectedState],
-    tool_call_id: Annotated[str, InjectedToolCallId],
-    replace_all: bool = False,
-) -> Union[Command, str]:
-    """Write to a file."""
-    mock_filesystem = state.get("files", {})
-    # Check if file exists in mock filesystem
-    if file_path not in mock_filesystem:
-        return f"Error: File '{file_path}' not found"
-
-    # Get current file content
-    content = mock_filesystem[file_path]
-
-    # Check if old_string exists in the file
-    if old_string not in content:
-        return f"Error: String not found in file: '{old_string}'"
-
-    # If not replace_all, check for uniqueness
-    if not replace_all:
-        occurrences = content.count(old_string)
-        if occurrences > 1:
-            return f"Error: String '{old_string}' appears {occurrences} times in file. Use replace_all=True to replace all instances, or provide a more specific string with surrounding context."
-        elif occurrences == 0:
+declare_side_effects(write_todos, side_effect_free=False)
+declare_side_effects(update_todos, side_effect_free=False)
+
+
+def create_filesystem_tools(backend: Optional[FilesystemBackend] = None) -> list[BaseTool]:
+    """Create the `ls`, `read_file`, `write_file`, `edit_file`, `glob` and `grep` tools.
+
+    Args:
+        backend: Where file contents live. Defaults to keeping them in state.
+    """
+    if backend is None:
+        backend = InMemoryBackend()
+    # Shared by `glob` and `grep`; each search runs against the caller's own files
+    search_index = FileSearchIndex(backend)
+
+    @tool(description=LIST_FILES_TOOL_DESCRIPTION)
+    def ls(state: Annotated[FilesystemState, InjectedState]) -> list[str]:
+        """List all files"""
+        return list(state.get("files", {}).keys())
+
+    @tool(description=READ_FILE_TOOL_DESCRIPTION)
+    def read_file(
+        file_path: str,
+        state: Annotated[FilesystemState, InjectedState],
+        offset: int = 0,
+        limit: int = 2000,
+    ) -> str:
+        files = state.get("files", {})
+        if file_path not in files:
+            return f"Error: File '{file_path}' not found"
+
+        # Line offsets are indexed once per file version, so paging only slices
+        # the requested lines instead of splitting the whole file on every call
+        index = backend.line_index(files[file_path])
+
+        # Handle empty file
+        if index.is_blank:
+            return "System reminder: File exists but has empty contents"
+
+        # Handle case where offset is beyond file length
+        if offset >= len(index):
+            return f"Error: Line offset {offset} exceeds file length ({len(index)} lines)"
+
+        # Format output with line numbers (cat -n format)
+        result_lines = []
+        for i, line_content in enumerate(index.lines(offset, offset + limit), start=offset):
+            # Truncate lines longer than 2000 characters
+            if len(line_content) > 2000:
+                line_content = line_content[:2000]
+
+            # Line numbers start at 1, so add 1 to the index
+            line_number = i + 1
+            result_lines.append(f"{line_number:6d}\t{line_content}")
+
+        return "\n".join(result_lines)
+
+    @tool(description=WRITE_FILE_TOOL_DESCRIPTION)
+    def write_file(
+        file_path: str,
+        content: str,
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ) -> Command:
+        return Command(
+            update={
+                # Only send the touched path; `file_reducer` merges it into state
+                "files": {file_path: backend.store(content)},
+                "messages": [
+                    ToolMessage(f"Updated file {file_path}", tool_call_id=tool_call_id)
+                ],
+            }
+        )
+
+    @tool(description=EDIT_FILE_TOOL_DESCRIPTION)
+    def edit_file(
+        file_path: str,
+        old_string: str,
+        new_string: str,
+        state: Annotated[FilesystemState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+        replace_all: bool = False,
+    ) -> Union[Command, str]:
+        """Write to a file."""
+        content = backend.read(state.get("files", {}), file_path)
+        if content is None:
+            return f"Error: File '{file_path}' not found"
+
+        # Check if old_string exists in the file
+        if old_string not in content:
             return f"Error: String not found in file: '{old_string}'"
 
-    # Perform the replacement
-    if replace_all:
-        new_content = content.replace(old_string, new_string)
-        replacement_count = content.count(old_string)
-        result_msg = f"Successfully replaced {replacement_count} instance(s) of the string in '{file_path}'"
-    else:
-        new_content = content.replace(
-            old_string, new_string, 1
-        )  # Replace only first occurrence
-        result_msg = f"Successfully replaced string in '{file_path}'"
-
-    # Update the mock filesystem
-    mock_filesystem[file_path] = new_content
-    return Command(
-        update={
-            "files": mock_filesystem,
-            "messages": [ToolMessage(result_msg, tool_call_id=tool_call_id)],
-        }
-    )
+        # If not replace_all, check for uniqueness
+        if not replace_all:
+            occurrences = content.count(old_string)
+            if occurrences > 1:
+                return f"Error: String '{old_string}' appears {occurrences} times in file. Use replace_all=True to replace all instances, or provide a more specific string with surrounding context."
+            elif occurrences == 0:
+                return f"Error: String not found in file: '{old_string}'"
+
+        # Perform the replacement
+        if replace_all:
+            new_content = content.replace(old_string, new_string)
+            replacement_count = content.count(old_string)
+            result_msg = f"Successfully replaced {replacement_count} instance(s) of the string in '{file_path}'"
+        else:
+            new_content = content.replace(
+                old_string, new_string, 1
+            )  # Replace only first occurrence
+            result_msg = f"Successfully replaced string in '{file_path}'"
+
+        return Command(
+            update={
+                "files": {file_path: backend.store(new_content)},
+                "messages": [ToolMessage(result_msg, tool_call_id=tool_call_id)],
+            }
+        )
+
+    @tool(description=GLOB_TOOL_DESCRIPTION)
+    def glob(pattern: str, state: Annotated[FilesystemState, InjectedState]) -> Union[list[str], str]:
+        paths = search_index.glob(state.get("files", {}), pattern)
+        return paths if paths else f"No files match '{pattern}'"
+
+    @tool(description=GREP_TOOL_DESCRIPTION)
+    def grep(
+        pattern: str,
+        state: Annotated[FilesystemState, InjectedState],
+        path_glob: str = "**",
+        ignore_case: bool = False,
+        max_matches: int = 100,
+    ) -> str:
+        try:
+            regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            return f"Error: Invalid regular expression '{pattern}': {e}"
+        files = state.get("files", {})
+        # The trigram index rules out files that cannot match, so the regex only runs over the rest
+        matches = []
+        for path in search_index.candidates(files, pattern, path_glob, regex.flags):
+            for line_number, line in enumerate(backend.load(files[path]).splitlines(), start=1):
+                if regex.search(line):
+                    matches.append(f"{path}:{line_number}: {line[:2000]}")
+                    if len(matches) >= max_matches:
+                        return "\n".join(matches) + f"\n(Stopped after {max_matches} matches; narrow the pattern or path_glob to see the rest)"
+        return "\n".join(matches) if matches else f"No matches for '{pattern}'"
+
+    return [
+        declare_side_effects(ls, side_effect_free=True),
+        declare_side_effects(read_file, side_effect_free=True),
+        declare_side_effects(write_file, side_effect_free=False),
+        declare_side_effects(edit_file, side_effect_free=False),
+        declare_side_effects(glob, side_effect_free=True),
+        declare_side_effects(grep, side_effect_free=True),
+    ]
+
+
+# Default tools, keeping file contents directly in state
+ls, read_file, write_file, edit_file, glob, grep = create_filesystem_tools()
@@ -0,0 +1,233 @@
+"""Per-run tracing of deep agents: where a run spent its time and tokens."""
+
+import json
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Protocol, Sequence, Union
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+# Tools that run a subagent; their spans hold the subagent's model and tool calls
+_SUBAGENT_TOOLS = ("task", "parallel_task")
+
+
+@dataclass
+class Span:
+    """One timed step of a run: the run itself, a model call, a tool call or a subagent delegation."""
+
+    name: str
+    kind: str  # "agent", "model", "tool" or "subagent"
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time_ns: int
+    end_time_ns: Optional[int] = None
+    error: Optional[str] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "duration_ms": self.duration_ms}
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: Sequence[Span]) -> None:
+        """Export the spans of one finished run, in start order."""
+
+
+class JSONLSpanExporter:
+    """Appends each span as one JSON line to a local file."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class OpenTelemetrySpanExporter:
+    """Re-emits spans through an OpenTelemetry tracer, keeping their nesting and timestamps.
+
+    Requires `opentelemetry-api` (`pip install deepagents[tracing]`); where the
+    spans go is up to the OpenTelemetry SDK and exporters configured in the app.
+    """
+
+    def __init__(self, tracer=None) -> None:
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetrySpanExporter requires opentelemetry-api: pip install deepagents[tracing]"
+            ) from e
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("deepagents")
+
+    def export(self, spans: Sequence[Span]) -> None:
+        otel_spans = {}
+        for span in spans:
+            parent = otel_spans.get(span.parent_id)
+            context = self._trace.set_span_in_context(parent) if parent is not None else None
+            attributes = {
+                f"deepagents.{k}": v for k, v in span.attributes.items() if isinstance(v, (str, bool, int, float))
+            }
+            otel_span = self.tracer.start_span(
+                span.name,
+                context=context,
+                start_time=span.start_time_ns,
+                attributes={"deepagents.kind": span.kind, **attributes},
+            )
+            if span.error is not None:
+                otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+            otel_spans[span.span_id] = otel_span
+        # Children end before their parents
+        for span in reversed(spans):
+            otel_spans[span.span_id].end(end_time=span.end_time_ns or span.start_time_ns)
+
+
+class Tracer(BaseCallbackHandler):
+    """Records a span for every model call, tool call and subagent delegation of a run.
+
+    Pass it to `create_deep_agent(tracer=...)`, or as a callback when invoking
+    any agent. Subagents run inside the `task` tool with the caller's callbacks,
+    so their model and tool calls are nested under that tool call's span. When
+    a run finishes, its spans are handed to every exporter.
+
+    Model spans carry the prompt size (`prompt_messages`, `prompt_chars`) and
+    the token usage reported by the provider (`input_tokens`, `output_tokens`,
+    `cached_tokens`).
+    """
+
+    # Keep span timing and order exact under async runs
+    run_inline = True
+
+    def __init__(self, exporters: Sequence[SpanExporter] = ()) -> None:
+        self.exporters = list(exporters)
+        self._spans: dict[UUID, Span] = {}
+        # Every run seen, recorded or not, to find the nearest recorded ancestor
+        self._parents: dict[UUID, Optional[UUID]] = {}
+        self._traces: dict[str, list[Span]] = {}
+        self._lock = threading.Lock()
+
+    def _start(
+        self,
+        run_id: UUID,
+        parent_run_id: Optional[UUID],
+        name: Optional[str] = None,
+        kind: Optional[str] = None,
+        attributes: Optional[dict[str, Any]] = None,
+    ) -> None:
+        now = time.time_ns()
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            ancestor = parent_run_id
+            while ancestor is not None and ancestor not in self._spans:
+                ancestor = self._parents.get(ancestor)
+            if name is None:
+                return
+            parent = self._spans.get(ancestor) if ancestor is not None else None
+            if parent is None and kind != "agent":
+                # Not inside a traced run (e.g. a tool invoked on its own)
+                return
+            span = Span(
+                name=name,
+                kind=kind,
+                trace_id=parent.trace_id if parent is not None else uuid.uuid4().hex,
+                span_id=uuid.uuid4().hex[:16],
+                parent_id=parent.span_id if parent is not None else None,
+                start_time_ns=now,
+                attributes=attributes or {},
+            )
+            self._spans[run_id] = span
+            self._traces.setdefault(span.trace_id, []).append(span)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes: Any) -> None:
+        now = time.time_ns()
+        finished = None
+        with self._lock:
+            parent_run_id = self._parents.pop(run_id, None)
+            span = self._spans.pop(run_id, None)
+            if span is None:
+                return
+            span.end_time_ns = now
+            span.attributes.update(attributes)
+            if error is not None:
+                span.error = f"{type(error).__name__}: {error}"
+            if span.parent_id is None and parent_run_id is None:
+                finished = self._traces.pop(span.trace_id, [])
+        if finished:
+            for exporter in self.exporters:
+                exporter.export(finished)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs) -> None:
+        # Only the outermost run gets a span; graph nodes and middleware hooks are not worth one each
+        if parent_run_id is None:
+            attributes = {"thread_id": (metadata or {}).get("thread_id")}
+            self._start(run_id, None, kwargs.get("name") or "agent", "agent", attributes)
+        else:
+            self._start(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error)
+
+    def on_chat_model_start(
+        self, serialized, messages: list[list[BaseMessage]], *, run_id, parent_run_id=None, metadata=None, **kwargs
+    ) -> None:
+        prompt = messages[0] if messages else []
+        metadata = metadata or {}
+        attributes = {
+            "model": metadata.get("ls_model_name"),
+            "prompt_messages": len(prompt),
+            "prompt_chars": len(get_buffer_string(prompt)),
+        }
+        self._start(run_id, parent_run_id, metadata.get("ls_model_name") or "model", "model", attributes)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs) -> None:
+        usage = {}
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        if isinstance(generation, ChatGeneration) and generation.message.usage_metadata:
+            usage_metadata = generation.message.usage_metadata
+            usage = {
+                "input_tokens": usage_metadata.get("input_tokens"),
+                "output_tokens": usage_metadata.get("output_tokens"),
+                "cached_tokens": (usage_metadata.get("input_token_details") or {}).get("cache_read", 0),
+            }
+        self._end(run_id, **usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(
+        self, serialized, input_str, *, run_id, parent_run_id=None, inputs=None, **kwargs
+    ) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        if name in _SUBAGENT_TOOLS:
+            inputs = inputs or {}
+            subagents = [inputs.get("subagent_type")] if name == "task" else [
+                t.get("subagent_type") for t in inputs.get("tasks", []) if isinstance(t, dict)
+            ]
+            self._start(run_id, parent_run_id, name, "subagent", {"subagent_type": ",".join(map(str, subagents))})
+        else:
+            self._start(run_id, parent_run_id, name, "tool", {"input_chars": len(input_str or "")})
+
+    def on_tool_end(self, output, *, run_id, **kwargs) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error)
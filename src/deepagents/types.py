@@ -5,17 +5,40 @@ from langchain.agents.middleware import AgentMiddleware
 from langchain_core.runnables import Runnable
 from langchain_core.tools import BaseTool
 
+class SummarizationConfig(TypedDict, total=False):
+    """When and how an agent summarizes its conversation history."""
+    # Approximate token count of the history that triggers a summary
+    max_tokens_before_summary: int
+    # Number of recent messages kept verbatim after summarizing
+    messages_to_keep: int
+    # Model that writes summaries: instance, model name or dict settings (defaults to the agent's model)
+    model: Union[LanguageModelLike, str, dict[str, Any]]
+    # Keep a running summary updated in small steps instead of re-summarizing in one call
+    incremental: bool
+    # With `incremental`, tool results above this many tokens are summarized once read
+    max_tool_message_tokens: int
+
+
 class SubAgent(TypedDict):
     name: str
     description: str
     prompt: str
-    tools: NotRequired[list[BaseTool]]
+    # Tools can also be given by name, referring to the main agent's tools
+    tools: NotRequired[list[Union[BaseTool, str]]]
     # Optional per-subagent model: can be either a model instance OR dict settings
     model: NotRequired[Union[LanguageModelLike, dict[str, Any]]]
     middleware: NotRequired[list[AgentMiddleware]]
+    # Optional summarization policy, defaults to the main agent's
+    summarization: NotRequired[SummarizationConfig]
 
 
 class CustomSubAgent(TypedDict):
     name: str
     description: str
-    graph: Runnable
\ No newline at end of file
+    graph: Runnable
+
+
+class SubAgentTask(TypedDict):
+    """One job for the `parallel_task` tool."""
+    description: str
+    subagent_type: str
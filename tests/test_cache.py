@@ -0,0 +1,93 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from deepagents import create_deep_agent
+from deepagents.cache import ModelResponseCache, ToolResultCache, cache_tool
+
+
+def _counting_search():
+    calls = []
+
+    @tool
+    def search(query: str, max_results: int = 5) -> str:
+        """Search for `query`."""
+        calls.append((query, max_results))
+        return f"{max_results} results for {query}"
+
+    return search, calls
+
+
+class TestCacheTool:
+    def test_repeated_calls_are_cached(self):
+        search, calls = _counting_search()
+        cached = cache_tool(search)
+        assert cached.name == "search" and cached.args == search.args
+        assert cached.invoke({"query": "pavers"}) == "5 results for pavers"
+        # Defaults are part of the key, so both spellings share the entry
+        assert cached.invoke({"query": "pavers", "max_results": 5}) == "5 results for pavers"
+        assert cached.invoke({"query": "pavers", "max_results": 2}) == "2 results for pavers"
+        assert calls == [("pavers", 5), ("pavers", 2)]
+
+    def test_async_calls_share_the_cache(self):
+        search, calls = _counting_search()
+        cached = cache_tool(search)
+        cached.invoke({"query": "hooks"})
+        assert asyncio.run(cached.ainvoke({"query": "hooks"})) == "5 results for hooks"
+        assert calls == [("hooks", 5)]
+
+    def test_results_expire(self):
+        search, calls = _counting_search()
+        cached = cache_tool(search, ttl=0)
+        cached.invoke({"query": "hooks"})
+        cached.invoke({"query": "hooks"})
+        assert len(calls) == 2
+
+
+class TestToolResultCache:
+    def test_lru_eviction(self):
+        cache = ToolResultCache(maxsize=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+
+    def test_results_persist(self, tmp_path):
+        search, calls = _counting_search()
+        path = tmp_path / "tools.sqlite"
+        cache_tool(search, ToolResultCache(path=path)).invoke({"query": "pavers"})
+        # A new process reading the same file
+        assert cache_tool(search, ToolResultCache(path=path)).invoke({"query": "pavers"}) == "5 results for pavers"
+        assert len(calls) == 1
+
+
+class _ToolCallingModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[t.name for t in tools])
+
+
+def _run(model, cache):
+    agent = create_deep_agent([], "You write copy.", model=model, model_cache=cache)
+    return agent.invoke({"messages": [{"role": "user", "content": "Write a hook"}]})
+
+
+class TestModelResponseCache:
+    def test_repeated_run_is_replayed(self, tmp_path):
+        path = tmp_path / "models.sqlite"
+        model = _ToolCallingModel(messages=iter([
+            AIMessage(content="", tool_calls=[
+                {"name": "write_file", "args": {"file_path": "/hook.txt", "content": "Pavers 20% off"}, "id": "c1"},
+            ]),
+            AIMessage(content="done"),
+        ]))
+        first = _run(model, ModelResponseCache(path=path))
+        # A model with no responses left can only answer from the cache
+        replay = _run(_ToolCallingModel(messages=iter([])), ModelResponseCache(path=path))
+        assert replay["files"] == first["files"] == {"/hook.txt": "Pavers 20% off"}
+        assert [m.content for m in replay["messages"]] == [m.content for m in first["messages"]]
+        # Replayed responses are new messages
+        assert not {m.id for m in replay["messages"]} & {m.id for m in first["messages"]}
@@ -0,0 +1,318 @@
+import asyncio
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from benchmarks.scripted_model import ScriptedChatModel, tool_call
+from deepagents import create_deep_agent
+from deepagents.middleware import SubAgentMiddleware
+from examples.copy_creator import agent as copy_creator_agent
+from examples.copy_creator import knowledge_base as knowledge_base_module
+from examples.copy_creator.knowledge_base import KnowledgeBaseIndex, KnowledgeBaseLoader, split_sections
+from examples.copy_creator.tools import KNOWLEDGE_BASE_INDEX, search_knowledge_base
+from examples.copy_creator.middleware import CopyOutputMiddleware, get_copies
+
+SAMPLE_MODEL = "claude-3-5-sonnet-20240620"
+
+
+class _ToolCallingModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _submitting_agent(number: int, content: str = ""):
+    model = _ToolCallingModel(messages=iter([
+        AIMessage(content="", tool_calls=[
+            {"name": "submit_copy", "args": {"number": number, "content": content or f"Copy {number}"}, "id": f"submit-{number}"},
+        ]),
+        AIMessage(content=f"Wrote copy {number}"),
+    ]))
+    return create_agent(model, tools=[], middleware=[CopyOutputMiddleware()])
+
+
+def _parallel_writers_agent(subagents: list):
+    """An agent that runs every subagent in one `parallel_task` call."""
+    model = _ToolCallingModel(messages=iter([
+        AIMessage(content="", tool_calls=[{
+            "name": "parallel_task",
+            "args": {"tasks": [
+                {"description": f"Task for {subagent['name']}", "subagent_type": subagent["name"]}
+                for subagent in subagents
+            ]},
+            "id": "parallel-1",
+        }]),
+        AIMessage(content="done"),
+    ]))
+    return create_agent(
+        model,
+        tools=[],
+        middleware=[CopyOutputMiddleware(), SubAgentMiddleware(subagents=subagents, model=SAMPLE_MODEL)],
+    )
+
+
+class TestCopyOutput:
+    def test_copies_from_parallel_subagents_are_all_kept(self):
+        subagents = [
+            {"name": f"writer_{number}", "description": "Writes one copy", "graph": _submitting_agent(number)}
+            for number in (1, 2)
+        ]
+        result = _parallel_writers_agent(subagents).invoke({"messages": [{"role": "user", "content": "Write 2 copies"}]})
+        assert get_copies(result) == [
+            {"id": "copy-1", "content": "Copy 1", "score": None},
+            {"id": "copy-2", "content": "Copy 2", "score": None},
+        ]
+
+    def test_a_copy_refined_by_a_parallel_subagent_keeps_the_refinement(self):
+        subagents = [
+            {"name": "refiner", "description": "Refines copy 1", "graph": _submitting_agent(1, "Refined copy 1")},
+            {"name": "writer", "description": "Writes copy 2", "graph": _submitting_agent(2)},
+        ]
+        result = _parallel_writers_agent(subagents).invoke({
+            "messages": [{"role": "user", "content": "Refine copy 1 and write copy 2"}],
+            "copies": {1: {"content": "Copy 1", "score": 7.0}},
+        })
+        # The writer was handed the old copy 1 too, which must not bring it back
+        assert get_copies(result) == [
+            {"id": "copy-1", "content": "Refined copy 1", "score": 7.0},
+            {"id": "copy-2", "content": "Copy 2", "score": None},
+        ]
+
+
+class _FlakyModel(ScriptedChatModel):
+    """Replays its script, but fails the first time it reaches `fail_on_step`."""
+
+    fail_on_step: int
+    calls: int = 0
+    failed: bool = False
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        result = super()._generate(messages, stop, run_manager, **kwargs)
+        if result.generations[0].message.response_metadata["script_step"] == self.fail_on_step and not self.failed:
+            self.failed = True
+            raise RuntimeError("provider unavailable")
+        return result
+
+
+INPUT = {
+    "cliente": "Acme Roofing",
+    "regiao": "Austin",
+    "servico": "Roof repair",
+    "ofertas": "Free inspection",
+    "telefone": "555-0100",
+    "reviews": "4.9 stars",
+    "pedido": "Crie 1 copies",
+}
+
+
+class TestRetry:
+    def test_failed_run_resumes_from_last_checkpoint(self, monkeypatch):
+        model = _FlakyModel(fail_on_step=2, script=[
+            AIMessage(content="", tool_calls=[tool_call("write_file", "write-1", file_path="/draft.md", content="draft")]),
+            AIMessage(content="", tool_calls=[tool_call("submit_copy", "submit-1", number=1, content="Copy 1")]),
+            AIMessage(content="Pronto"),
+        ])
+        agent = create_deep_agent(
+            [], "Write copies.", model=model, middleware=[CopyOutputMiddleware()],
+            checkpointer=copy_creator_agent.RUN_CHECKPOINTER,
+        )
+        monkeypatch.setattr(copy_creator_agent, "get_copy_creator", lambda *args, **kwargs: agent)
+        deleted = []
+        delete_thread = copy_creator_agent.RUN_CHECKPOINTER.adelete_thread
+
+        async def record_delete(thread_id):
+            deleted.append(thread_id)
+            await delete_thread(thread_id)
+
+        monkeypatch.setattr(copy_creator_agent.RUN_CHECKPOINTER, "adelete_thread", record_delete)
+
+        output = asyncio.run(copy_creator_agent.invoke_with_structured_output(INPUT, retry_delay=0))
+
+        assert output["type"] == "copies"
+        assert output["copies"] == [{"id": "copy-1", "content": "Copy 1", "score": None}]
+        # Steps 0 and 1 are not replayed: three steps plus the one retried call (six if the run started over)
+        assert model.calls == 4
+        assert len(deleted) == 1
+        assert not list(copy_creator_agent.RUN_CHECKPOINTER.list({"configurable": {"thread_id": deleted[0]}}))
+
+
+
+class TestStreamCopies:
+    def test_copies_and_scores_stream_before_the_result(self, monkeypatch):
+        writer = create_agent(
+            ScriptedChatModel(script=[
+                AIMessage(content="", tool_calls=[tool_call("submit_copy", "submit-1", number=1, content="Copy 1")]),
+                AIMessage(content="Wrote copy 1"),
+            ]),
+            tools=[],
+            middleware=[CopyOutputMiddleware()],
+        )
+        model = ScriptedChatModel(script=[
+            AIMessage(content="", tool_calls=[
+                tool_call("task", "task-1", description="Write copy 1", subagent_type="copy_writer"),
+            ]),
+            AIMessage(content="", tool_calls=[tool_call("submit_score", "score-1", number=1, score=8)]),
+            AIMessage(content="Pronto"),
+        ])
+        agent = create_deep_agent(
+            [], "Write copies.", model=model, middleware=[CopyOutputMiddleware()],
+            subagents=[{"name": "copy_writer", "description": "Writes one copy", "graph": writer}],
+        )
+        monkeypatch.setattr(copy_creator_agent, "get_copy_creator", lambda *args, **kwargs: agent)
+
+        async def collect():
+            return [event async for event in copy_creator_agent.stream_copies(INPUT)]
+
+        events = asyncio.run(collect())
+
+        # Each change is reported once, although the subagent's submission reaches the main agent again
+        assert events[:-1] == [
+            {"type": "copy", "copy": {"id": "copy-1", "content": "Copy 1"}},
+            {"type": "score", "id": "copy-1", "score": 8.0},
+        ]
+        state = agent.invoke({"messages": [{"role": "user", "content": str(INPUT)}]})
+        assert events[-1] == {"type": "result", "result": copy_creator_agent.build_copy_output(INPUT, 1, state)}
+        assert events[-1]["result"]["copies"] == [{"id": "copy-1", "content": "Copy 1", "score": 8.0}]
+        assert events[-1]["result"]["message"] == "Pronto"
+
+
+KNOWLEDGE_BASE = """# Hooks
+
+Intro line.
+
+## Urgência
+
+### Hook 1
+Agenda lotando, garanta sua vaga hoje.
+
+### Hook 2
+```
+# Not a heading: inside a code fence
+Desconto de 15% só esta semana.
+```
+
+## Empty
+
+## Autoridade
+Empresa 5 estrelas com 200 avaliações.
+"""
+
+
+class TestKnowledgeBase:
+    def _index(self, tmp_path, files):
+        paths = []
+        for name, content in files.items():
+            path = tmp_path / name
+            path.write_text(content, encoding="utf-8")
+            paths.append(path)
+        return KnowledgeBaseIndex(paths, loader=KnowledgeBaseLoader(check_interval=0))
+
+    def test_split_sections(self):
+        sections = split_sections(KNOWLEDGE_BASE, "hooks.md")
+        assert [s.title for s in sections] == ["hooks.md", "Urgência > Hook 1", "Urgência > Hook 2", "Autoridade"]
+        assert sections[2].text.endswith("Desconto de 15% só esta semana.\n```")
+        assert all(s.source == "hooks.md" for s in sections)
+
+    def test_ranking_order(self, tmp_path):
+        index = self._index(tmp_path, {
+            "hooks.md": KNOWLEDGE_BASE,
+            "offers.md": "## Oferta pavers\nDesconto em pavers. Pavers premium, pavers com garantia.\n\n"
+                         "## Oferta telhados\nDesconto em telhados, com uma menção a pavers.\n",
+        })
+        titles = [section.title for section, _ in index.search("pavers", k=5)]
+        # More occurrences in a section of similar length rank higher; sections without the term are left out
+        assert titles == ["Oferta pavers", "Oferta telhados"]
+        scores = [score for _, score in index.search("pavers", k=5)]
+        assert scores[0] > scores[1] > 0
+        # Accents and case are folded, and titles are searchable too
+        assert index.search("URGENCIA", k=1)[0][0].title.startswith("Urgência")
+        assert index.search("inexistente") == []
+
+    def test_duplicate_sections_are_indexed_once(self, tmp_path):
+        index = self._index(tmp_path, {"a.md": KNOWLEDGE_BASE, "b.md": KNOWLEDGE_BASE})
+        results = index.search("vaga desconto avaliações", k=10)
+        texts = [section.text for section, _ in results]
+        assert len(texts) == len(set(texts)) == 3
+        assert {section.source for section, _ in results} == {"a.md"}
+
+    def test_index_follows_file_changes(self, tmp_path):
+        index = self._index(tmp_path, {"hooks.md": KNOWLEDGE_BASE})
+        assert index.search("telhados") == []
+        (tmp_path / "hooks.md").write_text("## Telhados\nReforma de telhados.\n", encoding="utf-8")
+        assert [s.title for s, _ in index.search("telhados")] == ["Telhados"]
+
+    def test_shipped_copies_are_not_returned_twice(self):
+        # base-copys.md is a copy of validated-copies.md; without deduplication every match would appear twice
+        results = KNOWLEDGE_BASE_INDEX.search("pavers desconto califórnia", k=10)
+        assert results
+        texts = [section.text for section, _ in results]
+        assert len(texts) == len(set(texts))
+        assert "base-copys.md" not in {section.source for section, _ in results}
+        output = search_knowledge_base.invoke({"query": "pavers desconto califórnia", "k": 2})
+        assert output.count("[validated-copies.md › ") == 2
+
+
+class TestKnowledgeBaseLoader:
+    def _count_calls(self, monkeypatch, path):
+        """Count the stat calls and reads of `path` made from now on."""
+        calls = {"stat": 0, "read": 0}
+        stat, read_text = os.stat, Path.read_text
+
+        def counting_stat(p, *args, **kwargs):
+            calls["stat"] += isinstance(p, (str, os.PathLike)) and Path(p) == path
+            return stat(p, *args, **kwargs)
+
+        def counting_read_text(self, *args, **kwargs):
+            calls["read"] += self == path
+            return read_text(self, *args, **kwargs)
+
+        monkeypatch.setattr(os, "stat", counting_stat)
+        monkeypatch.setattr(Path, "read_text", counting_read_text)
+        return calls
+
+    def test_reloads_when_mtime_or_size_changes(self, tmp_path, monkeypatch):
+        path = tmp_path / "hooks.md"
+        path.write_text("first", encoding="utf-8")
+        loader = KnowledgeBaseLoader(check_interval=0)
+        calls = self._count_calls(monkeypatch, path)
+        assert loader.read(path) == "first"
+        assert loader.read(path) == "first"
+        assert calls == {"stat": 2, "read": 1}
+
+        # Same size, newer modification time
+        mtime = path.stat().st_mtime_ns + 10**9
+        path.write_text("FIRST", encoding="utf-8")
+        os.utime(path, ns=(mtime, mtime))
+        assert loader.read(path) == "FIRST"
+        # Same modification time, different size
+        path.write_text("first, edited", encoding="utf-8")
+        os.utime(path, ns=(mtime, mtime))
+        assert loader.read(path) == "first, edited"
+        assert calls["read"] == 3
+
+        loader.clear()
+        assert loader.read(path) == "first, edited"
+        assert calls["read"] == 4
+
+    def test_check_interval_suppresses_stat_calls(self, tmp_path, monkeypatch):
+        path = tmp_path / "hooks.md"
+        path.write_text("first", encoding="utf-8")
+        now = [100.0]
+        monkeypatch.setattr(knowledge_base_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        loader = KnowledgeBaseLoader(check_interval=5.0)
+        calls = self._count_calls(monkeypatch, path)
+        assert loader.read(path) == "first"
+
+        # Within the interval, even a changed file is served from memory without a stat call
+        path.write_text("first, edited", encoding="utf-8")
+        now[0] = 104.0
+        assert loader.read(path) == "first"
+        assert calls == {"stat": 1, "read": 1}
+
+        now[0] = 105.0
+        assert loader.read(path) == "first, edited"
+        assert calls == {"stat": 2, "read": 2}
@@ -0,0 +1,243 @@
+import re
+import threading
+
+from deepagents.backends import DiskBackend, InMemoryBackend, LineIndex
+from deepagents.state import file_reducer
+from deepagents.search import FileSearchIndex, PathTrie, case_fold, required_trigrams
+from deepagents.tools import write_file, edit_file, glob, grep, create_filesystem_tools
+
+
+def _call(tool, args, call_id="call-1"):
+    return tool.invoke({"name": tool.name, "args": args, "id": call_id, "type": "tool_call"})
+
+
+class TestFileReducer:
+    def test_upsert_only_touches_given_paths(self):
+        current = {"a.md": "a", "b.md": "b"}
+        merged = file_reducer(current, {"b.md": "B", "c.md": "c"})
+        assert merged == {"a.md": "a", "b.md": "B", "c.md": "c"}
+        # The previous value is shared with older checkpoints and must not change
+        assert current == {"a.md": "a", "b.md": "b"}
+        assert merged["a.md"] is current["a.md"]
+
+    def test_none_deletes_path(self):
+        merged = file_reducer({"a.md": "a", "b.md": "b"}, {"a.md": None, "missing.md": None})
+        assert merged == {"b.md": "b"}
+
+    def test_missing_sides(self):
+        assert file_reducer(None, {"a.md": "a", "b.md": None}) == {"a.md": "a"}
+        current = {"a.md": "a"}
+        assert file_reducer(current, None) is current
+
+
+class TestFilesystemTools:
+    def test_write_file_returns_delta(self):
+        command = _call(write_file, {"file_path": "copy1.md", "content": "hello"})
+        assert command.update["files"] == {"copy1.md": "hello"}
+
+    def test_edit_file_returns_delta_without_mutating_state(self):
+        state = {"messages": [], "files": {"copy1.md": "hello world", "copy2.md": "other"}}
+        command = _call(
+            edit_file,
+            {"file_path": "copy1.md", "old_string": "world", "new_string": "there", "state": state},
+        )
+        assert command.update["files"] == {"copy1.md": "hello there"}
+        assert state["files"]["copy1.md"] == "hello world"
+
+
+class TestDiskBackend:
+    def test_large_files_are_stored_as_references(self, tmp_path):
+        backend = DiskBackend(str(tmp_path), inline_threshold=16)
+        write, = [t for t in create_filesystem_tools(backend) if t.name == "write_file"]
+        content = "line\n" * 100
+        command = _call(write, {"file_path": "research.md", "content": content})
+        ref = command.update["files"]["research.md"]
+        assert ref.startswith(DiskBackend.REF_PREFIX)
+        assert backend.load(ref) == content
+        # Identical content is stored once
+        assert backend.store(content) == ref
+
+    def test_tools_read_and_edit_through_backend(self, tmp_path):
+        backend = DiskBackend(str(tmp_path), inline_threshold=0)
+        ls, read, _, edit, *_ = create_filesystem_tools(backend)
+        files = {"copy1.md": backend.store("hello world"), "input.txt": "inline"}
+        state = {"messages": [], "files": files}
+        assert sorted(ls.invoke({"state": state})) == ["copy1.md", "input.txt"]
+        assert read.invoke({"file_path": "copy1.md", "state": state}) == "     1\thello world"
+        assert read.invoke({"file_path": "input.txt", "state": state}) == "     1\tinline"
+        command = _call(
+            edit,
+            {"file_path": "copy1.md", "old_string": "world", "new_string": "there", "state": state},
+        )
+        new_files = file_reducer(files, command.update["files"])
+        assert backend.materialize(new_files) == {"copy1.md": "hello there", "input.txt": "inline"}
+
+
+class TestLineIndex:
+    def test_matches_splitlines(self):
+        for content in ["", "a", "a\n", "a\r\nb\r\n\n", "x\x85y\rz w\n"]:
+            for source in (content, content.encode("utf-8")):
+                index = LineIndex(source)
+                assert index.lines(0, len(index)) == content.splitlines()
+
+    def test_paged_read_reuses_index(self):
+        backend = InMemoryBackend()
+        _, read, _, _, *_ = create_filesystem_tools(backend)
+        content = "".join(f"line {i}\n" for i in range(1000))
+        state = {"messages": [], "files": {"big.md": content}}
+        page = read.invoke({"file_path": "big.md", "state": state, "offset": 500, "limit": 2})
+        assert page == "   501\tline 500\n   502\tline 501"
+        assert backend.line_index(content) is backend.line_index(content)
+        assert read.invoke({"file_path": "big.md", "state": state, "offset": 1000}) == (
+            "Error: Line offset 1000 exceeds file length (1000 lines)"
+        )
+
+    def test_cache_is_bounded_and_can_be_turned_off(self):
+        backend = InMemoryBackend(max_line_index_chars=100)
+        first, second = "a\n" * 30, "b\n" * 30
+        backend.line_index(first)
+        backend.line_index(second)
+        # Both together exceed the budget, so only the most recent one is kept
+        assert [value for value, _ in backend._line_indexes.values()] == [second]
+        assert backend._line_index_chars == 60
+        # An index over the budget on its own is still kept until another one is used
+        large = "c\n" * 100
+        assert backend.line_index(large) is backend.line_index(large)
+        assert [value for value, _ in backend._line_indexes.values()] == [large]
+        backend.line_index(first)
+        assert [value for value, _ in backend._line_indexes.values()] == [first]
+        backend.clear_line_indexes()
+        assert not backend._line_indexes and backend._line_index_chars == 0
+        uncached = InMemoryBackend(max_line_indexes=0)
+        assert uncached.line_index(first) is not uncached.line_index(first)
+        assert not uncached._line_indexes
+
+    def test_paged_read_from_disk_blob(self, tmp_path):
+        backend = DiskBackend(str(tmp_path), inline_threshold=0)
+        _, read, _, _, *_ = create_filesystem_tools(backend)
+        state = {"messages": [], "files": {"big.md": backend.store("première\nsecond\n")}}
+        assert read.invoke({"file_path": "big.md", "state": state, "offset": 0, "limit": 1}) == "     1\tpremière"
+
+
+class TestSearch:
+    FILES = {
+        "/research/market.md": "Audience: founders\nPrice point: $49\n",
+        "/research/competitors/acme.md": "Acme sells to founders too\n",
+        "/copies/copy1.md": "Hook: Stop guessing\nCTA: Start free\n",
+        "notes.txt": "remember the price point\n",
+    }
+
+    def test_glob(self):
+        state = {"messages": [], "files": self.FILES}
+        assert glob.invoke({"pattern": "/research/**/*.md", "state": state}) == [
+            "/research/competitors/acme.md", "/research/market.md",
+        ]
+        assert glob.invoke({"pattern": "*.txt", "state": state}) == ["notes.txt"]
+        assert "No files match" in glob.invoke({"pattern": "/drafts/*", "state": state})
+
+    def test_grep_returns_lines_with_numbers(self):
+        state = {"messages": [], "files": self.FILES}
+        result = grep.invoke({"pattern": "price point", "ignore_case": True, "state": state})
+        assert result == "/research/market.md:2: Price point: $49\nnotes.txt:1: remember the price point"
+        assert grep.invoke({"pattern": "founders", "path_glob": "/research/*.md", "state": state}) == (
+            "/research/market.md:1: Audience: founders"
+        )
+        assert "Invalid regular expression" in grep.invoke({"pattern": "(", "state": state})
+
+    def test_index_follows_changes(self):
+        index = FileSearchIndex(InMemoryBackend())
+        files = dict(self.FILES)
+        assert index.candidates(files, "founders") == ["/research/competitors/acme.md", "/research/market.md"]
+        files = file_reducer(files, {"/research/market.md": "Audience: marketers\n", "notes.txt": None})
+        assert index.candidates(files, "founders") == ["/research/competitors/acme.md"]
+        assert index.candidates(files, "price point") == []
+        assert index.glob(files, "*.txt") == []
+        # Successive versions of one run's files reuse the same index
+        assert len(index._indexes) == 1
+
+    def test_memory_is_bounded(self):
+        index = FileSearchIndex(InMemoryBackend(), max_indexed_chars=1000, max_cached_chars=1000)
+        first = {f"/first/{i}.md": f"first run {i}\n" * 5 for i in range(10)}
+        second = {f"/second/{i}.md": f"second run {i}\n" * 5 for i in range(10)}
+        assert len(index.candidates(first, "first run")) == 10
+        assert len(index.candidates(second, "second run")) == 10
+        # Both indexes together are over budget, so only the one used last is kept
+        [kept] = index._indexes
+        assert set(kept.values) == set(second)
+        assert 0 < index._cached_chars <= 1000
+        # The most recent index is kept even when it alone is over budget
+        index.max_indexed_chars = 1
+        assert len(index.candidates(first, "first run")) == 10
+        [kept] = index._indexes
+        assert set(kept.values) == set(first)
+        index.clear()
+        assert not index._indexes and not index._file_trigrams and index._cached_chars == 0
+
+    def test_case_insensitive_matches_are_never_filtered_out(self):
+        files = {"/a.md": "İSTANBUL office\n", "/b.md": "Straſse\n", "/c.md": "ΟΔΟΣ\n"}
+        state = {"messages": [], "files": files}
+        assert grep.invoke({"pattern": "istanbul", "ignore_case": True, "state": state}) == "/a.md:1: İSTANBUL office"
+        assert grep.invoke({"pattern": "strasse", "ignore_case": True, "state": state}) == "/b.md:1: Straſse"
+        assert grep.invoke({"pattern": "οδοσ", "ignore_case": True, "state": state}) == "/c.md:1: ΟΔΟΣ"
+        assert grep.invoke({"pattern": "(?i)Οδοσ", "state": state}) == "/c.md:1: ΟΔΟΣ"
+        # "Σ" lowercases to "ς" at the end of a word only, which must not hide a case-sensitive match
+        assert grep.invoke({"pattern": "ΟΔΟΣ", "state": {"messages": [], "files": {"/d.md": "ΟΔΟΣΑ\n"}}}) == (
+            "/d.md:1: ΟΔΟΣΑ"
+        )
+        # The fold keeps one character per character, which the table of exceptions relies on
+        characters = "".join(chr(code) for code in range(0x110000) if not 0xD800 <= code < 0xE000)
+        assert all(len(case_fold(char)) == 1 for char in characters)
+        # and merges every character that `re.IGNORECASE` matches to an ASCII letter into that letter
+        for char in re.findall("[a-z]", characters[0x80:], re.IGNORECASE):
+            assert case_fold(char).isascii() and re.fullmatch(case_fold(char), char, re.IGNORECASE)
+
+    def test_concurrent_searches_over_different_files(self):
+        grep_tool = next(t for t in create_filesystem_tools() if t.name == "grep")
+        errors = []
+
+        def search(worker):
+            # Every worker has its own files, so any path from another worker is a leak
+            files = {f"/run-{worker}/{i}.md": f"needle {worker}\nfiller text {i}\n" * 20 for i in range(100)}
+            state = {"messages": [], "files": files}
+            for _ in range(25):
+                try:
+                    result = grep_tool.invoke({"pattern": "needle", "path_glob": "**/0.md", "state": state})
+                except Exception as e:
+                    errors.append(e)
+                    return
+                if not result.startswith(f"/run-{worker}/0.md:1: needle {worker}\n"):
+                    errors.append(result)
+
+        threads = [threading.Thread(target=search, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+    def test_required_trigrams(self):
+        assert required_trigrams("foo.*bar") == {"foo", "bar"}
+        assert required_trigrams("colou?r") == {"col", "olo"}
+        assert required_trigrams("founders|marketers") == set()
+        assert required_trigrams(r"\d+ (users|people)") == set()
+        # The digits and names of an escape are not literals
+        assert required_trigrams(r"\x41bcd") == {"bcd"}
+        assert required_trigrams(r"\N{LATIN SMALL LETTER E WITH ACUTE}tude") == {"tud", "ude"}
+        assert required_trigrams(r"(a)\1bcd") == {"bcd"}
+        # An octal escape has at most three digits
+        assert required_trigrams(r"\1234bcd") == {"4bc", "bcd"}
+
+    def test_grep_with_escapes(self):
+        state = {"messages": [], "files": {"/a.md": "Abcd\n", "/b.md": "étude\n"}}
+        for pattern in (r"\x41bcd", r"\101bcd", r"A\x62cd", r"\U00000041bcd"):
+            assert grep.invoke({"pattern": pattern, "state": state}) == "/a.md:1: Abcd"
+        for pattern in (r"\u00e9tude", r"\N{LATIN SMALL LETTER E WITH ACUTE}tude", r"\351tude"):
+            assert grep.invoke({"pattern": pattern, "state": state}) == "/b.md:1: étude"
+
+    def test_trie_prunes_removed_paths(self):
+        trie = PathTrie()
+        trie.add("/a/b/c.md")
+        trie.add("/a/d.md")
+        trie.remove("/a/b/c.md")
+        assert list(trie.glob("**")) == ["/a/d.md"]
+        assert "b" not in trie.root.children[""].children["a"].children
@@ -0,0 +1,51 @@
+import re
+import subprocess
+import sys
+
+# Cumulative `import deepagents` time, in microseconds, as reported by `python -X importtime`
+IMPORT_BUDGET_US = 50_000
+
+PROVIDER_PACKAGES = ("langchain_google_genai", "langchain_anthropic", "langchain_openai", "google.genai", "anthropic")
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+
+
+def _import_time_us(stderr: str, module: str) -> int:
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", stderr, re.MULTILINE)
+    assert match, f"{module} not in -X importtime output"
+    return int(match.group(1))
+
+
+class TestImportTime:
+    def test_package_import_is_within_budget(self):
+        result = _run("import deepagents, sys; print('langgraph' in sys.modules)")
+        assert _import_time_us(result.stderr, "deepagents") < IMPORT_BUDGET_US
+        # Nothing heavy is loaded until an export is used
+        assert result.stdout.strip() == "False"
+
+    def test_building_an_agent_does_not_import_providers(self):
+        result = _run(
+            "import sys\n"
+            "from langchain_core.language_models.fake_chat_models import GenericFakeChatModel\n"
+            "from deepagents import create_deep_agent\n"
+            "subagents = [{'name': 'worker', 'description': 'Works.', 'prompt': 'Work.'}]\n"
+            "agent = create_deep_agent([], 'Help.', model=GenericFakeChatModel(messages=iter([])), subagents=subagents)\n"
+            f"print([m for m in {PROVIDER_PACKAGES!r} if m in sys.modules])"
+        )
+        assert result.stdout.strip() == "[]"
+
+    def test_optional_features_are_imported_on_use(self):
+        result = _run(
+            "import sys; from deepagents import create_deep_agent; "
+            "print([m for m in ('deepagents.cache', 'deepagents.summarization', 'deepagents.tracing') if m in sys.modules])"
+        )
+        assert result.stdout.strip() == "[]"
+
+    def test_exports_resolve(self):
+        import deepagents
+
+        for name in deepagents.__all__:
+            assert getattr(deepagents, name) is not None
+        assert "create_deep_agent" in dir(deepagents)
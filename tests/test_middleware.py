@@ -1,9 +1,18 @@
 from langchain.agents import create_agent
+from langchain.agents.middleware import ModelRequest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
 from deepagents.middleware import (
     PlanningMiddleware,
     FilesystemMiddleware,
     SubAgentMiddleware,
+    ToolResultCompactionMiddleware,
+    _with_tool_call_scheduling,
 )
+from deepagents.state import todos_reducer
+from deepagents.tools import write_todos, update_todos
+from deepagents.prompts import WRITE_TODOS_SYSTEM_PROMPT, FILESYSTEM_SYSTEM_PROMPT
 
 SAMPLE_MODEL = "claude-3-5-sonnet-20240620"
 
@@ -34,6 +43,7 @@ class TestAddMiddleware:
         ]
         agent = create_agent(model=SAMPLE_MODEL, middleware=middleware, tools=[])
         assert "task" in agent.nodes["tools"].bound._tools_by_name.keys()
+        assert "parallel_task" in agent.nodes["tools"].bound._tools_by_name.keys()
 
     def test_multiple_middleware(self):
         middleware = [
@@ -55,3 +65,147 @@ class TestAddMiddleware:
         assert "write_file" in agent_tools
         assert "edit_file" in agent_tools
         assert "task" in agent_tools
+
+
+def _model_request(system_prompt):
+    return ModelRequest(
+        model=None,
+        system_prompt=system_prompt,
+        messages=[],
+        tool_choice=None,
+        tools=[],
+        response_format=None,
+    )
+
+
+class TestSystemPrompt:
+    def test_prompt_is_composed_once_and_reused(self):
+        middleware = [PlanningMiddleware(), FilesystemMiddleware()]
+        prompts = []
+        for _ in range(2):
+            request = _model_request("You are a copywriter.")
+            for m in middleware:
+                request = m.modify_model_request(request, {"messages": []})
+            prompts.append(request.system_prompt)
+        assert prompts[0] is prompts[1]
+        assert prompts[0] == "You are a copywriter.\n\n" + WRITE_TODOS_SYSTEM_PROMPT + "\n\n" + FILESYSTEM_SYSTEM_PROMPT
+
+    def test_missing_prompt(self):
+        request = PlanningMiddleware().modify_model_request(_model_request(None), {"messages": []})
+        assert request.system_prompt == WRITE_TODOS_SYSTEM_PROMPT
+
+
+class TestToolResultCompaction:
+    def test_large_results_move_to_files(self):
+        middleware = ToolResultCompactionMiddleware(max_chars=100, preview_chars=10)
+        big = ToolMessage("line\n" * 100, tool_call_id="call-1", name="get_base_copys", id="m1")
+        small = ToolMessage("ok", tool_call_id="call-2", name="ls", id="m2")
+        read = ToolMessage("x" * 500, tool_call_id="call-3", name="read_file", id="m3")
+        update = middleware.before_model({"messages": [big, small, read]})
+        assert update["files"] == {"/tool_outputs/call-1.md": "line\n" * 100}
+        pointer, = update["messages"]
+        assert pointer.id == "m1" and pointer.tool_call_id == "call-1"
+        assert "/tool_outputs/call-1.md" in pointer.content
+        assert "line\nline\n" in pointer.content and len(pointer.content) < 500
+        # Already compacted results are left alone
+        assert middleware.before_model({"messages": [pointer, small, read], "files": update["files"]}) is None
+
+
+class _ToolCallingModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class TestToolCallScheduling:
+    def test_calls_with_side_effects_see_earlier_updates(self):
+        model = _ToolCallingModel(messages=iter([
+            AIMessage(content="", id="turn-1", tool_calls=[
+                {"name": "write_file", "args": {"file_path": "/a.txt", "content": "hello world"}, "id": "c1"},
+                {"name": "ls", "args": {}, "id": "c2"},
+                {"name": "edit_file", "args": {"file_path": "/a.txt", "old_string": "hello", "new_string": "bye"}, "id": "c3"},
+            ]),
+            AIMessage(content="done"),
+        ]))
+        agent = create_agent(model, tools=[], middleware=_with_tool_call_scheduling([], [FilesystemMiddleware()]))
+        result = agent.invoke({"messages": [{"role": "user", "content": "go"}]})
+        assert result["files"] == {"/a.txt": "bye world"}
+        tool_messages = {m.tool_call_id: m for m in result["messages"] if isinstance(m, ToolMessage)}
+        assert "/a.txt" in tool_messages["c2"].content
+        assert "Successfully" in tool_messages["c3"].content
+        # Every call is answered exactly once, in the order the model made them
+        assert [m.tool_call_id for m in result["messages"] if isinstance(m, ToolMessage)] == ["c1", "c2", "c3"]
+        assert result["messages"][-1].content == "done"
+
+    def test_task_sees_files_written_earlier_in_the_turn(self):
+        seen = {}
+
+        def run(state: dict) -> dict:
+            seen["files"] = state.get("files", {})
+            return {**state, "messages": [AIMessage(content="report")]}
+
+        subagents = [{"name": "writer", "description": "Writes", "graph": RunnableLambda(run)}]
+        model = _ToolCallingModel(messages=iter([
+            AIMessage(content="", id="turn-1", tool_calls=[
+                {"name": "write_file", "args": {"file_path": "/brief.md", "content": "the brief"}, "id": "c1"},
+                {"name": "task", "args": {"description": "Write a copy", "subagent_type": "writer"}, "id": "c2"},
+            ]),
+            AIMessage(content="done"),
+        ]))
+        middleware = [FilesystemMiddleware(), SubAgentMiddleware(subagents=subagents, model=SAMPLE_MODEL)]
+        agent = create_agent(model, tools=[], middleware=_with_tool_call_scheduling([], middleware))
+        result = agent.invoke({"messages": [{"role": "user", "content": "go"}]})
+        assert seen["files"] == {"/brief.md": "the brief"}
+        assert [m.tool_call_id for m in result["messages"] if isinstance(m, ToolMessage)] == ["c1", "c2"]
+
+    def test_read_only_calls_stay_in_one_turn(self):
+        middleware = _with_tool_call_scheduling([], [FilesystemMiddleware()])[0]
+        message = AIMessage(content="", tool_calls=[
+            {"name": "ls", "args": {}, "id": "c1"},
+            {"name": "read_file", "args": {"file_path": "/a.txt"}, "id": "c2"},
+            {"name": "write_file", "args": {"file_path": "/b.txt", "content": "b"}, "id": "c3"},
+        ])
+        assert middleware.after_model({"messages": [message]}) is None
+
+
+class TestTodos:
+    def _call(self, tool, args, **state):
+        call = {"name": tool.name, "args": {**args, **({"state": {"messages": [], **state}} if state else {})}, "id": "call-1", "type": "tool_call"}
+        return tool.invoke(call)
+
+    def test_write_todos_assigns_ids(self):
+        command = self._call(write_todos, {"todos": [
+            {"content": "Research", "status": "in_progress"},
+            {"content": "Write", "status": "pending"},
+        ]})
+        assert [todo["id"] for todo in command.update["todos"]] == ["1", "2"]
+        ack = command.update["messages"][0].content
+        assert "2 todos" in ack and "1: Research" in ack
+
+    def test_update_todos_applies_operations(self):
+        todos = [
+            {"id": "1", "content": "Research", "status": "in_progress"},
+            {"id": "2", "content": "Write", "status": "pending"},
+        ]
+        command = self._call(update_todos, {"operations": [
+            {"op": "update", "id": "1", "status": "completed"},
+            {"op": "add", "content": "Review"},
+            {"op": "remove", "id": "2"},
+        ]}, todos=todos)
+        assert command.update["messages"][0].content == "Todos: 1 -> completed, added 3, removed 2"
+        assert todos_reducer(todos, command.update["todos"]) == [
+            {"id": "1", "content": "Research", "status": "completed"},
+            {"id": "3", "content": "Review", "status": "pending"},
+        ]
+
+    def test_unknown_id_applies_nothing(self):
+        result = self._call(update_todos, {"operations": [
+            {"op": "update", "id": "1", "status": "completed"},
+            {"op": "remove", "id": "9"},
+        ]}, todos=[{"id": "1", "content": "Research", "status": "pending"}])
+        assert "No todo with id '9'" in result.content
+
+    def test_list_replaces_todos(self):
+        assert todos_reducer([{"id": "1", "content": "a", "status": "pending"}], []) == []
+
+    def test_planning_middleware_has_update_tool(self):
+        assert [t.name for t in PlanningMiddleware().tools] == ["write_todos", "update_todos"]
@@ -0,0 +1,12 @@
+from deepagents.model import get_chat_model
+
+SAMPLE_MODEL = "claude-3-5-sonnet-20240620"
+
+
+class TestGetChatModel:
+    def test_same_settings_share_an_instance(self):
+        model = get_chat_model(model=SAMPLE_MODEL, temperature=0)
+        assert get_chat_model(temperature=0, model=SAMPLE_MODEL) is model
+
+    def test_different_settings_get_their_own_instance(self):
+        assert get_chat_model(model=SAMPLE_MODEL, temperature=0) is not get_chat_model(model=SAMPLE_MODEL, temperature=1)
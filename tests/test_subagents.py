@@ -0,0 +1,268 @@
+import asyncio
+import threading
+
+import pytest
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import tool
+from langgraph.errors import GraphInterrupt
+
+from deepagents.middleware import SubAgentMiddleware, _get_agents, _resolve_subagent_tools
+
+SAMPLE_MODEL = "claude-3-5-sonnet-20240620"
+
+
+class _Overlap:
+    """Counts how many stand-in subagents are running at the same time."""
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def enter(self) -> None:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+    def exit(self) -> None:
+        with self.lock:
+            self.running -= 1
+
+
+def _writer_graph(path: str, barrier: threading.Barrier | None = None, overlap: _Overlap | None = None):
+    """A stand-in subagent that writes one file and reports back.
+
+    With a `barrier`, a sync run waits until that many runs are in progress at
+    once; with `overlap`, an async run records how many run at the same time.
+    """
+
+    def run(state: dict) -> dict:
+        if barrier is not None:
+            barrier.wait(timeout=5)
+        description = state["messages"][-1]["content"]
+        return {
+            **state,
+            "files": {**state.get("files", {}), path: description},
+            "messages": [AIMessage(content=f"wrote {path}")],
+        }
+
+    async def arun(state: dict) -> dict:
+        if overlap is not None:
+            overlap.enter()
+            # Yield long enough for any other admitted run to start
+            await asyncio.sleep(0.01)
+            overlap.exit()
+        return run(state)
+
+    return RunnableLambda(run, afunc=arun)
+
+
+def _failing_graph():
+    def run(state: dict) -> dict:
+        raise RuntimeError("subagent crashed")
+
+    return RunnableLambda(run)
+
+
+def _get_tool(middleware: SubAgentMiddleware, name: str):
+    return next(t for t in middleware.tools if t.name == name)
+
+
+def _call(tool, args, call_id="call-1"):
+    return tool.invoke({"name": tool.name, "args": args, "id": call_id, "type": "tool_call"})
+
+
+def _interrupting_graph():
+    def run(state: dict) -> dict:
+        raise GraphInterrupt()
+
+    async def arun(state: dict) -> dict:
+        raise GraphInterrupt()
+
+    return RunnableLambda(run, afunc=arun)
+
+
+def _merge_scores(left, right):
+    return {**(left or {}), **(right or {})}
+
+
+class _ScoresGraph:
+    """A subagent graph stand-in that sets some `scores` and exposes the reducer of that channel."""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.channels = {"scores": type("Channel", (), {"operator": staticmethod(_merge_scores)})()}
+
+    def invoke(self, state, config=None):
+        scores = {**state.get("scores", {}), **self.scores}
+        return {**state, "scores": scores, "messages": [AIMessage(content="scored")]}
+
+
+SUBAGENTS = [
+    {"name": "hook_writer", "description": "Writes hooks", "graph": _writer_graph("hook.md")},
+    {"name": "copy_writer", "description": "Writes copies", "graph": _writer_graph("copy.md")},
+    {"name": "broken", "description": "Always fails", "graph": _failing_graph()},
+    {"name": "needs_approval", "description": "Asks a human", "graph": _interrupting_graph()},
+]
+
+
+class TestParallelTask:
+    def test_runs_tasks_concurrently_and_merges_files(self):
+        # Every run waits for the other two, so the tasks only finish if all three run at once
+        barrier = threading.Barrier(3)
+        subagents = [
+            {"name": "hook_writer", "description": "Writes hooks", "graph": _writer_graph("hook.md", barrier=barrier)},
+            {"name": "copy_writer", "description": "Writes copies", "graph": _writer_graph("copy.md", barrier=barrier)},
+        ]
+        middleware = SubAgentMiddleware(subagents=subagents, model=SAMPLE_MODEL, max_concurrency=4)
+        parallel_task = _get_tool(middleware, "parallel_task")
+        state = {"messages": [], "files": {"brief.md": "brief"}}
+        tasks = [
+            {"description": "hook one", "subagent_type": "hook_writer"},
+            {"description": "copy one", "subagent_type": "copy_writer"},
+            {"description": "hook two", "subagent_type": "hook_writer"},
+        ]
+        command = _call(parallel_task, {"tasks": tasks, "state": state})
+        assert "Error" not in command.update["messages"][0].content
+        # Only changed paths come back, and the later task wins on hook.md
+        assert command.update["files"] == {"hook.md": "hook two", "copy.md": "copy one"}
+        report = command.update["messages"][0].content
+        assert report.index("## Task 1 (hook_writer)") < report.index("## Task 3 (hook_writer)")
+
+    def test_failed_task_does_not_drop_other_results(self):
+        middleware = SubAgentMiddleware(subagents=SUBAGENTS, model=SAMPLE_MODEL)
+        parallel_task = _get_tool(middleware, "parallel_task")
+        tasks = [
+            {"description": "boom", "subagent_type": "broken"},
+            {"description": "copy one", "subagent_type": "copy_writer"},
+        ]
+        command = _call(parallel_task, {"tasks": tasks, "state": {"messages": []}})
+        assert command.update["files"] == {"copy.md": "copy one"}
+        assert "Error: subagent crashed" in command.update["messages"][0].content
+
+    def test_unknown_subagent_type(self):
+        middleware = SubAgentMiddleware(subagents=SUBAGENTS, model=SAMPLE_MODEL)
+        parallel_task = _get_tool(middleware, "parallel_task")
+        tasks = [{"description": "x", "subagent_type": "missing"}]
+        result = _call(parallel_task, {"tasks": tasks, "state": {"messages": []}})
+        assert "Error: invoked agent of type missing" in result.content
+
+    @pytest.mark.parametrize("max_concurrency", [1, 2])
+    def test_async_respects_concurrency_limit(self, max_concurrency):
+        overlap = _Overlap()
+        subagents = [
+            {"name": "hook_writer", "description": "Writes hooks", "graph": _writer_graph("hook.md", overlap=overlap)},
+            {"name": "copy_writer", "description": "Writes copies", "graph": _writer_graph("copy.md", overlap=overlap)},
+        ]
+        middleware = SubAgentMiddleware(subagents=subagents, model=SAMPLE_MODEL, is_async=True, max_concurrency=max_concurrency)
+        parallel_task = _get_tool(middleware, "parallel_task")
+        tasks = [
+            {"description": "hook one", "subagent_type": "hook_writer"},
+            {"description": "copy one", "subagent_type": "copy_writer"},
+            {"description": "hook two", "subagent_type": "hook_writer"},
+        ]
+        command = asyncio.run(
+            parallel_task.ainvoke(
+                {"name": "parallel_task", "args": {"tasks": tasks, "state": {"messages": []}}, "id": "1", "type": "tool_call"}
+            )
+        )
+        assert overlap.max_running == max_concurrency
+        assert command.update["files"] == {"hook.md": "hook two", "copy.md": "copy one"}
+
+    def test_interrupts_are_not_reported_as_errors(self):
+        tasks = [
+            {"description": "copy one", "subagent_type": "copy_writer"},
+            {"description": "approve", "subagent_type": "needs_approval"},
+        ]
+        args = {"tasks": tasks, "state": {"messages": []}}
+        sync_tool = _get_tool(SubAgentMiddleware(subagents=SUBAGENTS, model=SAMPLE_MODEL), "parallel_task")
+        with pytest.raises(GraphInterrupt):
+            _call(sync_tool, args)
+        async_tool = _get_tool(SubAgentMiddleware(subagents=SUBAGENTS, model=SAMPLE_MODEL, is_async=True), "parallel_task")
+        with pytest.raises(GraphInterrupt):
+            asyncio.run(async_tool.ainvoke({"name": "parallel_task", "args": args, "id": "1", "type": "tool_call"}))
+
+    def test_reducer_keys_from_every_task_are_kept(self):
+        subagents = [
+            {"name": f"scorer_{i}", "description": "Scores", "graph": _ScoresGraph({i: 8})} for i in (1, 2)
+        ]
+        parallel_task = _get_tool(SubAgentMiddleware(subagents=subagents, model=SAMPLE_MODEL), "parallel_task")
+        tasks = [{"description": "score", "subagent_type": f"scorer_{i}"} for i in (1, 2)]
+        command = _call(parallel_task, {"tasks": tasks, "state": {"messages": [], "scores": {0: 5}}})
+        assert _merge_scores({0: 5}, command.update["scores"]) == {0: 5, 1: 8, 2: 8}
+
+    def test_a_sibling_task_does_not_revert_an_updated_entry(self):
+        subagents = [
+            {"name": "rescorer", "description": "Rescores", "graph": _ScoresGraph({0: 9})},
+            {"name": "scorer", "description": "Scores", "graph": _ScoresGraph({2: 8})},
+        ]
+        parallel_task = _get_tool(SubAgentMiddleware(subagents=subagents, model=SAMPLE_MODEL), "parallel_task")
+        tasks = [{"description": "score", "subagent_type": name} for name in ("rescorer", "scorer")]
+        command = _call(parallel_task, {"tasks": tasks, "state": {"messages": [], "scores": {0: 5, 1: 6}}})
+        # Only the entries each task changed come back, so the scorer's stale copy of 0 is not among them
+        assert command.update["scores"] == {0: 9, 2: 8}
+        assert _merge_scores({0: 5, 1: 6}, command.update["scores"]) == {0: 9, 1: 6, 2: 8}
+
+
+class TestTaskHandoff:
+    def test_parent_state_is_not_mutated_or_copied(self):
+        seen = {}
+
+        def run(state: dict) -> dict:
+            seen.update(state)
+            return {**state, "files": {**state["files"], "copy.md": "copy"}, "messages": [AIMessage(content="done")]}
+
+        subagents = [{"name": "writer", "description": "Writes", "graph": RunnableLambda(run)}]
+        task = _get_tool(SubAgentMiddleware(subagents=subagents, model=SAMPLE_MODEL), "task")
+        parent_messages = [{"role": "user", "content": "write a copy"}]
+        files = {"brief.md": "brief"}
+        state = {"messages": parent_messages, "files": files, "todos": [], "research": "notes"}
+        command = _call(task, {"description": "copy", "subagent_type": "writer", "state": state})
+        assert state["messages"] is parent_messages
+        assert seen["files"] is files
+        assert "todos" not in seen and seen["messages"] == [{"role": "user", "content": "copy"}]
+        # Unchanged keys are not sent back
+        assert set(command.update) == {"files", "messages"}
+        assert command.update["files"] == {"copy.md": "copy"}
+
+
+class TestLazySubAgents:
+    def test_subagents_compile_on_first_use(self):
+        subagents = [
+            *SUBAGENTS,
+            {
+                "name": "unbuildable",
+                "description": "Would fail to compile",
+                "prompt": "unused",
+                "model": {"model": "not-a-provider:not-a-model"},
+            },
+        ]
+        # Building the middleware does not compile (or fail to compile) anything
+        middleware = SubAgentMiddleware(subagents=subagents, model=SAMPLE_MODEL)
+        task = _get_tool(middleware, "task")
+        command = _call(task, {"description": "copy", "subagent_type": "copy_writer", "state": {"messages": []}})
+        assert command.update["files"] == {"copy.md": "copy"}
+
+    def test_compiled_graphs_are_reused(self):
+        agents = _get_agents([], [], SAMPLE_MODEL)
+        assert list(agents) == ["general-purpose"]
+        assert agents["general-purpose"] is agents["general-purpose"]
+
+
+@tool(description="Looks up templates")
+def get_templates() -> str:
+    return "templates"
+
+
+class TestSubAgentToolNames:
+    def test_names_resolve_to_main_agent_tools(self):
+        subagent = {"name": "researcher", "description": "", "prompt": "", "tools": ["get_templates", "read_file"]}
+        # Built-in tools come from the subagent's own middleware
+        assert _resolve_subagent_tools(subagent, [get_templates]) == [get_templates]
+
+    def test_unknown_name_is_an_error(self):
+        subagent = {"name": "researcher", "description": "", "prompt": "", "tools": ["internet_search"]}
+        with pytest.raises(ValueError, match="unknown tool internet_search"):
+            _resolve_subagent_tools(subagent, [get_templates])
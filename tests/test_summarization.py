@@ -0,0 +1,110 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from deepagents.model import get_chat_model
+from deepagents.summarization import (
+    RUNNING_SUMMARY_ID,
+    CachedTokenCounter,
+    RollingSummarizationMiddleware,
+    create_summarization_middleware,
+)
+
+SAMPLE_MODEL = "claude-3-5-sonnet-20240620"
+
+
+class TestCachedTokenCounter:
+    def test_matches_approximate_count(self):
+        messages = [HumanMessage("hello there", id="1"), AIMessage("general kenobi " * 50, id="2"), HumanMessage("no id")]
+        assert CachedTokenCounter()(messages) == count_tokens_approximately(messages)
+
+    def test_replaced_message_is_recounted(self):
+        counter = CachedTokenCounter()
+        assert counter([AIMessage("x" * 400, id="1")]) > counter([AIMessage("short", id="1")])
+
+
+class TestSummarizationConfig:
+    def test_defaults(self):
+        model = get_chat_model(model=SAMPLE_MODEL)
+        middleware = create_summarization_middleware(model)
+        assert middleware.model is model
+        assert middleware.max_tokens_before_summary == 120000
+        assert middleware.messages_to_keep == 20
+
+    def test_custom_policy_and_summary_model(self):
+        config = {"max_tokens_before_summary": 30000, "messages_to_keep": 6, "model": {"model": SAMPLE_MODEL, "temperature": 0}}
+        middleware = create_summarization_middleware(get_chat_model(model=SAMPLE_MODEL), config)
+        assert middleware.model is get_chat_model(model=SAMPLE_MODEL, temperature=0)
+        assert middleware.max_tokens_before_summary == 30000
+        assert middleware.messages_to_keep == 6
+
+
+class _RecordingModel(GenericFakeChatModel):
+    prompts: list = []
+
+    def invoke(self, input, *args, **kwargs):
+        self.prompts.append(input)
+        return super().invoke(input, *args, **kwargs)
+
+
+def _summarizer(*replies):
+    return _RecordingModel(messages=iter([AIMessage(r) for r in replies]), prompts=[])
+
+
+def _turns(n, size=400):
+    return [
+        m
+        for i in range(n)
+        for m in (HumanMessage("q" * size, id=f"h{i}"), AIMessage("a" * size, id=f"a{i}"))
+    ]
+
+
+class TestRollingSummarization:
+    def test_below_threshold_does_nothing(self):
+        middleware = RollingSummarizationMiddleware(_summarizer(), max_tokens_before_summary=10000)
+        assert middleware.before_model({"messages": _turns(3)}) is None
+
+    def test_evicts_oldest_messages_into_running_summary(self):
+        model = _summarizer("summary one", "summary two")
+        middleware = RollingSummarizationMiddleware(
+            model, max_tokens_before_summary=2000, messages_to_keep=2, max_tokens_per_summary=500
+        )
+        messages = _turns(10)  # about 2000 tokens
+        update = middleware.before_model({"messages": messages})
+        assert update["running_summary"] == "summary two"
+        assert isinstance(update["messages"][0], RemoveMessage)
+        summary_message, *preserved = update["messages"][1:]
+        assert summary_message.id == RUNNING_SUMMARY_ID
+        # Only enough messages to get under 70% of the threshold are evicted, in two bounded calls
+        assert preserved == messages[-len(preserved):]
+        assert 2 < len(preserved) < len(messages)
+        assert len(model.prompts) == 2
+        assert "summary one" in model.prompts[1]
+
+        # The next fold starts from the running summary, not from the summary message
+        model = _summarizer("partial", "partial", "summary three")
+        middleware.model = model
+        update = middleware.before_model(
+            {"messages": [summary_message, *preserved, *_turns(6)], "running_summary": "summary two"}
+        )
+        assert update["running_summary"] == "summary three"
+        assert "summary two" in model.prompts[0]
+        assert "Here is a summary" not in model.prompts[0]
+
+    def test_large_tool_results_are_summarized_once_read(self):
+        model = _summarizer("the gist")
+        middleware = RollingSummarizationMiddleware(model, max_tool_message_tokens=100)
+        call = AIMessage("", tool_calls=[{"name": "get_base_copys", "args": {}, "id": "call-1"}], id="a0")
+        result = ToolMessage("x" * 2000, tool_call_id="call-1", name="get_base_copys", id="t0")
+        # Not summarized before the model has seen it
+        assert middleware.before_model({"messages": [HumanMessage("hi", id="h0"), call, result]}) is None
+        update = middleware.before_model(
+            {"messages": [HumanMessage("hi", id="h0"), call, result, AIMessage("done", id="a1")]}
+        )
+        summarized, = update["messages"]
+        assert summarized.id == "t0" and summarized.tool_call_id == "call-1"
+        assert summarized.content == "[Summarized tool result]\nthe gist"
+
+    def test_config_selects_rolling_mode(self):
+        middleware = create_summarization_middleware(get_chat_model(model=SAMPLE_MODEL), {"incremental": True})
+        assert isinstance(middleware, RollingSummarizationMiddleware)
@@ -0,0 +1,55 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from deepagents import create_deep_agent
+from deepagents.tracing import JSONLSpanExporter, Tracer
+
+
+class _ToolCallingModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class _CollectingExporter:
+    def __init__(self):
+        self.runs = []
+
+    def export(self, spans):
+        self.runs.append(list(spans))
+
+
+class TestTracer:
+    def test_subagent_spans_are_nested_under_the_task_call(self, tmp_path):
+        worker = _ToolCallingModel(messages=iter([
+            AIMessage(content="", tool_calls=[{"name": "ls", "args": {}, "id": "ls-1"}]),
+            AIMessage(content="report", usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12}),
+        ]))
+        model = _ToolCallingModel(messages=iter([
+            AIMessage(content="", tool_calls=[
+                {"name": "task", "args": {"description": "Research", "subagent_type": "worker"}, "id": "task-1"},
+            ]),
+            AIMessage(content="done"),
+        ]))
+        collected = _CollectingExporter()
+        path = tmp_path / "spans.jsonl"
+        agent = create_deep_agent(
+            [],
+            "Trace me.",
+            model=model,
+            subagents=[{"name": "worker", "description": "Researches.", "prompt": "Research.", "model": worker}],
+            tracer=Tracer([collected, JSONLSpanExporter(path)]),
+        )
+        agent.invoke({"messages": [{"role": "user", "content": "go"}]})
+
+        spans, = collected.runs
+        by_id = {span.span_id: span for span in spans}
+        root, = [span for span in spans if span.parent_id is None]
+        task, = [span for span in spans if span.kind == "subagent"]
+        assert root.kind == "agent" and task.parent_id == root.span_id
+        assert task.attributes["subagent_type"] == "worker"
+        nested = [span for span in spans if by_id.get(span.parent_id) is task]
+        assert [span.kind for span in nested] == ["model", "tool", "model"]
+        assert nested[2].attributes["input_tokens"] == 10 and nested[2].attributes["prompt_messages"] == 4
+        assert len([span for span in spans if span.kind == "model" and span.parent_id == root.span_id]) == 2
+        assert all(span.duration_ms is not None and span.duration_ms >= 0 for span in spans)
+        assert len(path.read_text().splitlines()) == len(spans)